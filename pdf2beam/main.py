@@ -1,12 +1,20 @@
 import argparse
+import asyncio
+import hashlib
 import json
 import logging
+import orjson
 import os
+import re
+import time
 
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from pdf2docx import Converter
 
+from tex2beam.classes.response_cache import ResponseCache
+
 
 logging.basicConfig(
     format="[%(asctime)s] %(levelname)-12s %(message)s",
@@ -14,41 +22,229 @@ logging.basicConfig(
 )
 logger = logging.getLogger()
 
+MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = """Convert the presentation slides to LaTeX Beamer frames.
+                     Output only the frame environments, without a preamble,
+                     \\begin{document} or \\end{document}.
+                     Include all text and complete all slides."""
+TITLE_PROMPT = """The first slide is the title slide. Before the frames,
+                     output the \\title, \\author, \\institute and \\date
+                     commands, and use \\titlepage in the first frame."""
+# Document boilerplate and code fences are added or removed locally
+DOCUMENT_RE = re.compile(
+    r"\\documentclass.*\n?|\\begin\{document\}|\\end\{document\}|```(?:latex)?"
+)
+CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "pdf2beam", "responses.sqlite"
+)
+# Placeholders chatGPT uses when it does not generate the full LaTeX code
+UNWANTED_PHRASES = [
+    "% Include all remaining",
+    "% Include remaining",
+    "% Include more",
+    "% Include all other",
+    "% Add more slides",
+    "% Add more content",
+    "% Add remaining",
+    "% Adding more",
+    "% Adding remaining",
+    "% Content for this slide is missing",
+]
+UNWANTED_PHRASES_RE = re.compile("|".join(map(re.escape, UNWANTED_PHRASES)))
+
+
+def make_cache_key(model: str, system_prompt: str, presentation: dict) -> str:
+    """Creates a response cache key from the request parameters.
+
+    Args:
+        model: Name of the OpenAI model.
+        system_prompt: System prompt.
+        presentation: Presentation.
+
+    Returns:
+        SHA-256 hex digest of the request.
+    """
+    request = orjson.dumps(
+        {"m": model, "sys": system_prompt, "u": presentation},
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+    )
+    return hashlib.sha256(request).hexdigest()
+
+
+def estimate_tokens(messages: list) -> int:
+    """Roughly estimates the number of tokens in chat messages.
+
+    Args:
+        messages: List of chat messages.
+
+    Returns:
+        Estimated number of tokens, assuming about four characters per token.
+    """
+    return sum(len(message["content"]) for message in messages) // 4
+
+
+class RateLimiter:
+    """Request and token rate limiter for the OpenAI API."""
+
+    def __init__(
+        self,
+        max_requests_per_min: int = 500,
+        max_tokens_per_min: int = 200000,
+    ):
+        """Initializes the RateLimiter class.
+
+        Args:
+            max_requests_per_min: Maximum number of requests per minute.
+            max_tokens_per_min: Maximum number of tokens per minute.
+        """
+        self.max_requests_per_min = max_requests_per_min
+        self.max_tokens_per_min = max_tokens_per_min
+        self.remaining_requests = max_requests_per_min
+        self.remaining_tokens = max_tokens_per_min
+        self.reset_time = time.monotonic() + 60
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Waits until the request and token budgets allow a new request.
+
+        Args:
+            tokens: Estimated number of tokens in the request.
+        """
+        # A request larger than the full budget is let through once reset
+        tokens = min(tokens, self.max_tokens_per_min)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now >= self.reset_time:
+                    self.remaining_requests = self.max_requests_per_min
+                    self.remaining_tokens = self.max_tokens_per_min
+                    self.reset_time = now + 60
+                if (
+                    self.remaining_requests > 0
+                    and self.remaining_tokens >= tokens
+                ):
+                    break
+                logger.debug("Rate limit reached, waiting.")
+                await asyncio.sleep(self.reset_time - now)
+            self.remaining_requests -= 1
+            self.remaining_tokens -= tokens
+
+    def update(self, headers) -> None:
+        """Updates the budgets from the OpenAI rate limit response headers.
 
-def read_pdf_presentation(pdf_path: str) -> dict:
+        Args:
+            headers: HTTP response headers.
+        """
+        try:
+            requests = headers.get("x-ratelimit-remaining-requests")
+            tokens = headers.get("x-ratelimit-remaining-tokens")
+            if requests is not None:
+                self.remaining_requests = min(
+                    self.remaining_requests, int(requests)
+                )
+            if tokens is not None:
+                self.remaining_tokens = min(self.remaining_tokens, int(tokens))
+        except ValueError as e:
+            logger.debug(f"Invalid rate limit headers: {e}")
+
+
+def read_pdf_presentation(pdf_path: str, chunk_size: int = 1) -> dict:
     """Reads a PDF file and returns its content.
 
+    The pages are parsed in chunks and only the extracted text is kept, so the
+    parsed layout of the whole presentation is never held in memory at once.
+
     Args:
         pdf_path: Path to the PDF file.
+        chunk_size: Number of pages to parse at a time.
 
     Returns:
         Content of the PDF file.
     """
     logger.debug(f"Reading PDF file: {pdf_path}")
     converter = Converter(pdf_path)
-    converter.parse(**converter.default_settings)
-    presentation = converter.store()
-    text_contents = extract_text_contents(presentation)
-    return text_contents
+    document: dict = {"frames": []}
+    try:
+        page_count = len(converter.fitz_doc)
+        for start in range(0, page_count, chunk_size):
+            converter.parse(
+                start=start,
+                end=min(start + chunk_size, page_count),
+                **converter.default_settings,
+            )
+            for page in converter.store()["pages"]:
+                document["frames"].append(extract_page_contents(page))
+    finally:
+        converter.close()
+    return document
+
+
+def try_read_pdf_presentation(pdf_path: str) -> dict:
+    """Reads a PDF file like `read_pdf_presentation`, but logs read errors.
+
+    Used in batch runs, so that a single PDF file that cannot be read does
+    not stop the whole batch.
+
+    Args:
+        pdf_path: Path to the PDF file.
+
+    Returns:
+        Content of the PDF file, or None if the file cannot be read.
+    """
+    try:
+        return read_pdf_presentation(pdf_path)
+    except Exception as e:
+        logger.error(f"Error reading {pdf_path}: {e}")
+        return None
 
 
 def get_text(obj, key="text"):
-    # Recursive function to find text within "blocks"
+    # Iterative depth-first search for text within "blocks". Stack entries
+    # are (is_text, value) pairs pushed in reverse so the text is returned
+    # in document order.
     slide_text = []
-    if isinstance(obj, dict):  # If the current object is a dictionary
-        for k, v in obj.items():
-            if k == key:
-                slide_text.append(v)  # Add the text to the list
-            elif isinstance(v, (dict, list)):
-                # Recurse into dictionaries/lists
-                slide_text.extend(get_text(v, key))
-    elif isinstance(obj, list):  # If the current object is a list
-        for item in obj:
-            # Recurse into each item
-            slide_text.extend(get_text(item, key))
+    stack = [(False, obj)]
+    while stack:
+        is_text, current = stack.pop()
+        if is_text:
+            slide_text.append(current)
+        elif isinstance(current, dict):
+            stack.extend(
+                reversed(
+                    [
+                        (k == key, v)
+                        for k, v in current.items()
+                        if k == key or isinstance(v, (dict, list))
+                    ]
+                )
+            )
+        elif isinstance(current, list):
+            stack.extend((False, item) for item in reversed(current))
     return slide_text
 
 
+def extract_page_contents(page: dict) -> list:
+    """Extracts text contents from a single page of a presentation.
+
+    Args:
+        page: Page stored by pdf2docx.
+
+    Returns:
+        Text contents of the page, one string per non-empty block. Repeated
+        blocks, e.g. headers and footers, are only included once.
+    """
+    frame = []
+    for section in page["sections"]:
+        for column in section["columns"]:
+            for block in column["blocks"]:
+                text = " ".join(
+                    " ".join(str(t) for t in get_text(block)).split()
+                )
+                if text:
+                    frame.append(text)
+    return list(dict.fromkeys(frame))
+
+
 def extract_text_contents(presentation: Converter) -> dict:
     """Extracts text contents from a presentation.
 
@@ -61,69 +257,336 @@ def extract_text_contents(presentation: Converter) -> dict:
     logger.info("Extracting text contents.")
     document: dict = {"frames": []}
     for page in presentation["pages"]:
-        document["frames"].append([])
-        frame = document["frames"][-1]
-        for section in page["sections"]:
-            for column in section["columns"]:
-                # page_contents.append(get_text(column))
-                for block in column["blocks"]:
-                    frame.append(get_text(block))
+        document["frames"].append(extract_page_contents(page))
     return document
 
 
-def convert_to_latex(presentation: dict, api_key: str, retries: int = 3) -> str:
-    """Converts a presentation to LaTeX using chatGPT API.
+def split_presentation(presentation: dict, frames_per_request: int = 1):
+    """Splits a presentation into the chunks converted in each request.
 
     Args:
         presentation: Presentation.
+        frames_per_request: Number of frames per chunk.
 
     Returns:
-        LaTeX code.
+        List of presentations with at most `frames_per_request` frames.
     """
-    logger.info("Converting presentation to LaTeX.")
+    frames = presentation["frames"]
+    return [
+        {"frames": frames[i : i + frames_per_request]}
+        for i in range(0, len(frames), frames_per_request)
+    ]
 
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {
-                "role": "system",
-                "content": """Convert the presentation to LaTeX Beamer.
-                     Ensure to parse the title slide properly.
-                     Include all text and complete all slides.""",
-            },
-            {"role": "user", "content": f"{json.dumps(presentation)}"},
-        ],
-    )
-    content = response.choices[0].message.content
 
-    logger.info("Beamer presentation generated.")
-    # Check if chatGPT is been lazy and not generating the full LaTeX code
-    unwanted_phrases = [
-        "% Include all remaining",
-        "% Include remaining",
-        "% Include more",
-        "% Include all other",
-        "% Add more slides",
-        "% Add more content",
-        "% Add remaining",
-        "% Adding more",
-        "% Adding remaining",
-        "% Content for this slide is missing",
+def get_system_prompt(index: int) -> str:
+    """Returns the system prompt for a chunk of the presentation.
+
+    Args:
+        index: Index of the chunk.
+
+    Returns:
+        System prompt. The first chunk also converts the title slide.
+    """
+    if index == 0:
+        return SYSTEM_PROMPT + "\n" + TITLE_PROMPT
+    return SYSTEM_PROMPT
+
+
+def build_messages(chunk: dict, system_prompt: str = SYSTEM_PROMPT) -> list:
+    """Builds the chat messages for converting a chunk of a presentation.
+
+    Args:
+        chunk: Presentation, or a chunk of one.
+        system_prompt: System prompt.
+
+    Returns:
+        List of chat messages.
+    """
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": orjson.dumps(
+                chunk, option=orjson.OPT_NON_STR_KEYS
+            ).decode(),
+        },
     ]
-    for phrase in unwanted_phrases:
-        if phrase in content:
-            if retries > 0:
-                logger.info("Retrying conversion.")
-                return convert_to_latex(presentation, api_key, retries - 1)
-            else:
-                raise ValueError(
-                    "chatGPT did not generate the full LaTeX code."
+
+
+def assemble_presentation(fragments: list) -> str:
+    """Stitches converted frames into a LaTeX Beamer document.
+
+    Args:
+        fragments: Generated LaTeX code for each chunk, in order.
+
+    Returns:
+        LaTeX code.
+    """
+    fragments = [DOCUMENT_RE.sub("", f).strip() for f in fragments]
+    preamble = "\\documentclass{beamer}\n"
+    if fragments:
+        # The title commands of the first chunk go before the document
+        head, frame, tail = fragments[0].partition("\\begin{frame}")
+        if frame and head.strip():
+            preamble += head.strip() + "\n"
+            fragments[0] = frame + tail
+    return (
+        preamble
+        + "\\begin{document}\n"
+        + "\n\n".join(fragments)
+        + "\n\\end{document}\n"
+    )
+
+
+def is_incomplete(content: str) -> bool:
+    """Checks if chatGPT has been lazy and not generated the full LaTeX code.
+
+    Args:
+        content: Generated LaTeX code.
+
+    Returns:
+        True if the LaTeX code contains placeholders for missing content.
+    """
+    return UNWANTED_PHRASES_RE.search(content) is not None
+
+
+def convert_chunk(
+    chunk: dict,
+    system_prompt: str,
+    client: OpenAI,
+    model: str = MODEL,
+    retries: int = 3,
+    cache: ResponseCache = None,
+) -> str:
+    """Converts a chunk of a presentation to LaTeX using chatGPT API.
+
+    Args:
+        chunk: Chunk of a presentation.
+        system_prompt: System prompt.
+        client: OpenAI client.
+        model: Name of the OpenAI model.
+        retries: Number of retries if the generated code is incomplete.
+        cache: Response cache. Disabled if None.
+
+    Returns:
+        LaTeX code for the frames in the chunk.
+    """
+    if cache:
+        key = make_cache_key(model, system_prompt, chunk)
+        content = cache.get(key)
+        if content is not None:
+            logger.debug("Frames read from cache.")
+            return content
+
+    messages = build_messages(chunk, system_prompt)
+    for _ in range(retries + 1):
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+        )
+        content = response.choices[0].message.content
+        if not is_incomplete(content):
+            break
+        logger.info("Retrying conversion.")
+    else:
+        raise ValueError("chatGPT did not generate the full LaTeX code.")
+
+    if cache:
+        cache.set(key, content)
+    return content
+
+
+async def await_shared(inflight: dict, key: str) -> str:
+    """Awaits a conversion task shared between identical chunks.
+
+    Args:
+        inflight: Dictionary of request keys and conversion tasks.
+        key: Request key.
+
+    Returns:
+        Result of the conversion task.
+    """
+    task = inflight[key]
+    try:
+        return await task
+    except Exception:
+        # Let a later identical chunk try again
+        if inflight.get(key) is task:
+            del inflight[key]
+        raise
+
+
+async def convert_chunk_async(
+    chunk: dict,
+    system_prompt: str,
+    client: AsyncOpenAI,
+    sem: asyncio.Semaphore,
+    rate_limiter: "RateLimiter" = None,
+    model: str = MODEL,
+    retries: int = 3,
+    cache: ResponseCache = None,
+    inflight: dict = None,
+) -> str:
+    """Converts a chunk of a presentation to LaTeX using the asynchronous
+    chatGPT API.
+
+    Args:
+        chunk: Chunk of a presentation.
+        system_prompt: System prompt.
+        client: Asynchronous OpenAI client.
+        sem: Semaphore limiting the number of concurrent requests.
+        rate_limiter: Request and token rate limiter. Disabled if None.
+        model: Name of the OpenAI model.
+        retries: Number of retries if the generated code is incomplete.
+        cache: Response cache. Disabled if None.
+        inflight: Dictionary of request keys and conversion tasks, shared
+          between presentations so identical chunks are only converted once.
+          Disabled if None.
+
+    Returns:
+        LaTeX code for the frames in the chunk.
+    """
+    if inflight is not None:
+        key = make_cache_key(model, system_prompt, chunk)
+        if key in inflight:
+            logger.debug("Reusing conversion of an identical chunk.")
+        else:
+            inflight[key] = asyncio.ensure_future(
+                convert_chunk_async(
+                    chunk,
+                    system_prompt,
+                    client,
+                    sem,
+                    rate_limiter,
+                    model,
+                    retries,
+                    cache,
+                )
+            )
+        return await await_shared(inflight, key)
+
+    if cache:
+        key = make_cache_key(model, system_prompt, chunk)
+        content = cache.get(key)
+        if content is not None:
+            logger.debug("Frames read from cache.")
+            return content
+
+    messages = build_messages(chunk, system_prompt)
+    for _ in range(retries + 1):
+        async with sem:
+            if rate_limiter:
+                await rate_limiter.acquire(estimate_tokens(messages))
+            raw_response = (
+                await client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=messages,
                 )
+            )
+        if rate_limiter:
+            rate_limiter.update(raw_response.headers)
+        content = raw_response.parse().choices[0].message.content
+        if not is_incomplete(content):
+            break
+        logger.info("Retrying conversion.")
+    else:
+        raise ValueError("chatGPT did not generate the full LaTeX code.")
 
+    if cache:
+        cache.set(key, content)
     return content
 
 
+def convert_to_latex(
+    presentation: dict,
+    api_key: str,
+    retries: int = 3,
+    cache: ResponseCache = None,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+) -> str:
+    """Converts a presentation to LaTeX using chatGPT API.
+
+    The frames are converted in chunks of `frames_per_request` frames, and
+    the document boilerplate is added locally.
+
+    Args:
+        presentation: Presentation.
+        api_key: OpenAI API key.
+        retries: Number of retries if the generated code is incomplete.
+        cache: Response cache. Disabled if None.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
+
+    Returns:
+        LaTeX code.
+    """
+    logger.info("Converting presentation to LaTeX.")
+    client = OpenAI(api_key=api_key)
+    fragments = [
+        convert_chunk(
+            chunk, get_system_prompt(i), client, model, retries, cache
+        )
+        for i, chunk in enumerate(
+            split_presentation(presentation, frames_per_request)
+        )
+    ]
+    logger.info("Beamer presentation generated.")
+    return assemble_presentation(fragments)
+
+
+async def convert_to_latex_async(
+    presentation: dict,
+    client: AsyncOpenAI,
+    sem: asyncio.Semaphore,
+    rate_limiter: "RateLimiter" = None,
+    retries: int = 3,
+    cache: ResponseCache = None,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+    inflight: dict = None,
+) -> str:
+    """Converts a presentation to LaTeX using the asynchronous chatGPT API.
+
+    The chunks of the presentation are converted concurrently.
+
+    Args:
+        presentation: Presentation.
+        client: Asynchronous OpenAI client.
+        sem: Semaphore limiting the number of concurrent requests.
+        rate_limiter: Request and token rate limiter. Disabled if None.
+        retries: Number of retries if the generated code is incomplete.
+        cache: Response cache. Disabled if None.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
+        inflight: Dictionary of in-flight conversion tasks. Disabled if None.
+
+    Returns:
+        LaTeX code.
+    """
+    logger.info("Converting presentation to LaTeX.")
+    fragments = await asyncio.gather(
+        *[
+            convert_chunk_async(
+                chunk,
+                get_system_prompt(i),
+                client,
+                sem,
+                rate_limiter,
+                model,
+                retries,
+                cache,
+                inflight,
+            )
+            for i, chunk in enumerate(
+                split_presentation(presentation, frames_per_request)
+            )
+        ]
+    )
+    logger.info("Beamer presentation generated.")
+    return assemble_presentation(fragments)
+
+
 def write_latex(latex_code: str, output_path: str) -> None:
     """Writes LaTeX code to a file.
 
@@ -142,17 +605,271 @@ def write_latex(latex_code: str, output_path: str) -> None:
         logger.info(f"LaTeX code written to file: {output_path}")
 
 
-def convert(pdf_path: str, output_path: str, api_key: str) -> None:
+def convert(
+    pdf_path: str,
+    output_path: str,
+    api_key: str,
+    cache: ResponseCache = None,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+) -> None:
     """Main function.
 
     Args:
         args: Arguments from command-line call.
     """
     presentation = read_pdf_presentation(pdf_path)
-    latex_code = convert_to_latex(presentation, api_key)
+    latex_code = convert_to_latex(
+        presentation,
+        api_key,
+        cache=cache,
+        model=model,
+        frames_per_request=frames_per_request,
+    )
     write_latex(latex_code, output_path)
 
 
+async def convert_async(
+    pdf_path: str,
+    output_path: str,
+    client: AsyncOpenAI,
+    sem: asyncio.Semaphore,
+    executor: Executor,
+    rate_limiter: RateLimiter = None,
+    cache: ResponseCache = None,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+    inflight: dict = None,
+) -> None:
+    """Converts a PDF presentation to LaTeX using the asynchronous API.
+
+    Args:
+        pdf_path: Path to the PDF file.
+        output_path: Path to the output LaTeX file.
+        client: Asynchronous OpenAI client.
+        sem: Semaphore limiting the number of concurrent requests.
+        executor: Executor used for parsing the PDF files.
+        rate_limiter: Request and token rate limiter. Disabled if None.
+        cache: Response cache. Disabled if None.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
+        inflight: Dictionary of in-flight conversion tasks. Disabled if None.
+    """
+    loop = asyncio.get_running_loop()
+    presentation = await loop.run_in_executor(
+        executor, read_pdf_presentation, pdf_path
+    )
+    latex_code = await convert_to_latex_async(
+        presentation,
+        client,
+        sem,
+        rate_limiter,
+        cache=cache,
+        model=model,
+        frames_per_request=frames_per_request,
+        inflight=inflight,
+    )
+    # Write in a worker thread so the file I/O does not block the event loop
+    await asyncio.to_thread(write_latex, latex_code, output_path)
+
+
+async def convert_all(
+    jobs: list,
+    api_key: str,
+    cache: ResponseCache = None,
+    workers: int = None,
+    max_concurrent: int = 8,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+) -> None:
+    """Converts PDF presentations to LaTeX concurrently.
+
+    Args:
+        jobs: List of (PDF path, output path) tuples.
+        api_key: OpenAI API key.
+        cache: Response cache. Disabled if None.
+        workers: Number of processes used for parsing the PDF files.
+        max_concurrent: Maximum number of concurrent OpenAI requests.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
+    """
+    client = AsyncOpenAI(api_key=api_key)
+    sem = asyncio.Semaphore(max_concurrent)
+    rate_limiter = RateLimiter()
+    # Identical chunks, e.g. template title or closing slides, are only
+    # converted once per run
+    inflight: dict = {}
+    # Parsing is CPU-bound, so it runs in separate processes
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = await asyncio.gather(
+            *[
+                convert_async(
+                    pdf_path,
+                    target_file,
+                    client,
+                    sem,
+                    executor,
+                    rate_limiter=rate_limiter,
+                    cache=cache,
+                    model=model,
+                    frames_per_request=frames_per_request,
+                    inflight=inflight,
+                )
+                for pdf_path, target_file in jobs
+            ],
+            return_exceptions=True,
+        )
+    for (pdf_path, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            file = os.path.basename(pdf_path)
+            logger.error(f"Error converting {file}: {result}")
+
+
+def write_batch_input(
+    jobs: list,
+    presentations: list,
+    batch_input: str,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+) -> tuple:
+    """Writes the OpenAI Batch API input file for a set of presentations.
+
+    Args:
+        jobs: List of (PDF path, output path) tuples.
+        presentations: Presentations, in the same order as the jobs.
+        batch_input: Path to the batch input JSONL file.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
+
+    Returns:
+        Dictionary of request IDs and (output path, chunk index) tuples, and
+        dictionary of output paths and empty lists for the chunk results.
+    """
+    requests: dict = {}
+    fragments: dict = {}
+    os.makedirs(os.path.dirname(batch_input), exist_ok=True)
+    with open(batch_input, "wb") as file:
+        for (pdf_path, target_file), presentation in zip(jobs, presentations):
+            chunks = split_presentation(presentation, frames_per_request)
+            fragments[target_file] = [None] * len(chunks)
+            for i, chunk in enumerate(chunks):
+                custom_id = f"{os.path.relpath(pdf_path)}#{i}"
+                requests[custom_id] = (target_file, i)
+                request = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "messages": build_messages(chunk, get_system_prompt(i)),
+                    },
+                }
+                file.write(orjson.dumps(request) + b"\n")
+    return requests, fragments
+
+
+def parse_batch_output(output: str, requests: dict, fragments: dict) -> None:
+    """Stores the LaTeX code of the batch results in the fragments.
+
+    Failed and incomplete requests are logged, and their fragments are left
+    empty.
+
+    Args:
+        output: Content of the batch output JSONL file.
+        requests: Dictionary of request IDs and (output path, chunk index)
+          tuples.
+        fragments: Dictionary of output paths and lists of chunk results,
+          updated in place.
+    """
+    for line in output.splitlines():
+        result = json.loads(line)
+        custom_id = result["custom_id"]
+        try:
+            if result.get("error"):
+                raise ValueError(result["error"])
+            body = result["response"]["body"]
+            content = body["choices"][0]["message"]["content"]
+            if is_incomplete(content):
+                raise ValueError(
+                    "chatGPT did not generate the full LaTeX code."
+                )
+            target_file, i = requests[custom_id]
+            fragments[target_file][i] = content
+        except Exception as e:
+            logger.error(f"Error converting {custom_id}: {e}")
+
+
+def batch_convert(
+    jobs: list,
+    api_key: str,
+    batch_folder: str,
+    workers: int = None,
+    poll_interval: int = 60,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+) -> None:
+    """Converts PDF presentations to LaTeX using the OpenAI Batch API.
+
+    Args:
+        jobs: List of (PDF path, output path) tuples.
+        api_key: OpenAI API key.
+        batch_folder: Folder to save the batch input file.
+        workers: Number of processes used for parsing the PDF files.
+        poll_interval: Seconds between batch status checks.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
+    """
+    # Parsing is CPU-bound, so it runs in separate processes
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        presentations = list(
+            executor.map(try_read_pdf_presentation, [job[0] for job in jobs])
+        )
+    # PDF files that cannot be read are skipped
+    read = [i for i, presentation in enumerate(presentations) if presentation]
+    jobs = [jobs[i] for i in read]
+    presentations = [presentations[i] for i in read]
+    if not jobs:
+        logger.error("None of the PDF files could be read.")
+        return
+    batch_input = os.path.join(batch_folder, "batch_input.jsonl")
+    requests, fragments = write_batch_input(
+        jobs, presentations, batch_input, model, frames_per_request
+    )
+
+    client = OpenAI(api_key=api_key)
+    with open(batch_input, "rb") as file:
+        input_file = client.files.create(file=file, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    logger.info(f"Created batch {batch.id} with {len(requests)} requests.")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        logger.debug(f"Batch {batch.id} status: {batch.status}")
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} {batch.status}.")
+
+    if batch.output_file_id is None:
+        # All requests of the batch failed
+        logger.error(
+            f"Batch {batch.id} has no output, see error file "
+            f"{batch.error_file_id}."
+        )
+        return
+    output = client.files.content(batch.output_file_id).text
+    parse_batch_output(output, requests, fragments)
+
+    for target_file, chunks in fragments.items():
+        if None in chunks:
+            logger.error(f"Incomplete batch results for {target_file}.")
+            continue
+        write_latex(assemble_presentation(chunks), target_file)
+
+
 def main(args: argparse.Namespace) -> None:
     """Main function.
 
@@ -160,40 +877,99 @@ def main(args: argparse.Namespace) -> None:
         args: Arguments from command-line call.
     """
     logger.info("Starting main function.")
+    cache = None if args.no_cache else ResponseCache(CACHE_PATH)
     if args.source_folder:
-        folder_walk(args.source_folder, args.target_folder, args.api_key)
+        folder_walk(
+            args.source_folder,
+            args.target_folder,
+            args.api_key,
+            cache=cache,
+            refresh=args.refresh,
+            workers=args.workers,
+            max_concurrent=args.max_concurrent,
+            batch=args.batch,
+            model=args.model,
+            frames_per_request=args.frames_per_request,
+        )
     elif args.pdf_path:
-        convert(args.pdf_path, args.output_path, args.api_key)
+        convert(
+            args.pdf_path,
+            args.output_path,
+            args.api_key,
+            cache=cache,
+            model=args.model,
+            frames_per_request=args.frames_per_request,
+        )
     else:
         raise ValueError("Invalid arguments.")
     logger.info("Finished main function.")
 
 
-def folder_walk(source_folder: str, target_folder: str, api_key: str) -> None:
+def folder_walk(
+    source_folder: str,
+    target_folder: str,
+    api_key: str,
+    cache: ResponseCache = None,
+    refresh: bool = False,
+    workers: int = None,
+    max_concurrent: int = 8,
+    batch: bool = False,
+    model: str = MODEL,
+    frames_per_request: int = 1,
+) -> None:
     """Walks through a folder and converts all PDF files to LaTeX.
 
     Args:
         source_folder: Source folder with the PDF files to convert.
         target_folder: Target folder to save the LaTeX files.
+        cache: Response cache. Disabled if None.
+        refresh: Convert files even if the target file already exists.
+        workers: Number of processes used for parsing the PDF files.
+        max_concurrent: Maximum number of concurrent OpenAI requests.
+        batch: Use the OpenAI Batch API instead of real-time requests.
+        model: Name of the OpenAI model.
+        frames_per_request: Number of frames converted per request.
     """
+    os.makedirs(target_folder, exist_ok=True)
+    # List the target folder once instead of checking each file
+    with os.scandir(target_folder) as entries:
+        existing = {entry.name for entry in entries}
+    jobs = []
     for root, dirs, files in os.walk(source_folder):
         for file in files:
             if file.endswith("-presentation.pdf"):
-                target_file = os.path.join(
-                    target_folder, file.replace(".pdf", ".tex")
-                )
+                target_name = file.replace(".pdf", ".tex")
                 # check if target file exists
-                if not args.refresh and os.path.exists(target_file):
+                if not refresh and target_name in existing:
                     logger.info(f"Skipping {file} as it already exists.")
                     continue
-                try:
-                    convert(
-                        pdf_path=os.path.join(root, file),
-                        output_path=target_file,
-                        api_key=api_key,
-                    )
-                except Exception as e:
-                    logger.error(f"Error converting {file}: {e}")
+                target_file = os.path.join(target_folder, target_name)
+                jobs.append((os.path.join(root, file), target_file))
+
+    if not jobs:
+        logger.info("No PDF files to convert.")
+        return
+    if batch:
+        batch_convert(
+            jobs,
+            api_key,
+            target_folder,
+            workers=workers,
+            model=model,
+            frames_per_request=frames_per_request,
+        )
+        return
+    asyncio.run(
+        convert_all(
+            jobs,
+            api_key,
+            cache=cache,
+            workers=workers,
+            max_concurrent=max_concurrent,
+            model=model,
+            frames_per_request=frames_per_request,
+        )
+    )
 
 
 def parse_args() -> argparse.Namespace:
@@ -218,6 +994,44 @@ def parse_args() -> argparse.Namespace:
         help="Refresh all LaTeX files in the target folder",
         default=False,
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the on-disk chatGPT response cache",
+        default=False,
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of processes used for parsing PDF files in a folder",
+        default=None,
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        help="Maximum number of concurrent OpenAI requests",
+        default=8,
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        help="Use the OpenAI Batch API when converting a folder",
+        default=False,
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        help="OpenAI model used for the conversion",
+        default=MODEL,
+    )
+    parser.add_argument(
+        "--frames-per-request",
+        type=int,
+        help="Number of frames converted in each OpenAI request",
+        default=1,
+    )
     # pdf-path and source-folder are mutually exclusive
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
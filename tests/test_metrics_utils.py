@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from scipy.stats import kendalltau
+
+from tex2beam.metrics import utils
+
+
+def set_confusion_matrix(candidate_titles, reference_titles, matches):
+    """Confusion matrix counted from sets of the matched elements."""
+    TP = len(matches)
+    FP = len(set(candidate_titles)) - len(
+        set([match["candidate"]["element"] for match in matches])
+    )
+    FN = len(set(reference_titles)) - len(
+        set([match["reference"]["element"] for match in matches])
+    )
+    return np.array([[TP, FP], [FN, 0]])
+
+
+def random_matches(rng, candidates, references, n_matches):
+    """Matches between random unique candidate and reference elements."""
+    matches = []
+    for _ in range(n_matches):
+        i = int(rng.integers(len(candidates)))
+        j = int(rng.integers(len(references)))
+        matches.append(
+            {
+                "candidate": {"element": candidates[i], "index": i},
+                "reference": {"element": references[j], "index": j},
+            }
+        )
+    return matches
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_confusion_matrix_matches_set_count(seed):
+    rng = np.random.default_rng(seed)
+    candidates = [f"Candidate {i}" for i in range(rng.integers(1, 12))]
+    references = [f"Reference {i}" for i in range(rng.integers(1, 12))]
+    # Duplicate titles count once
+    candidate_titles = candidates + candidates[: rng.integers(3)]
+    reference_titles = references + references[: rng.integers(3)]
+    matches = random_matches(
+        rng, candidates, references, int(rng.integers(0, 15))
+    )
+    np.testing.assert_array_equal(
+        utils.calculate_confusion_matrix(
+            candidate_titles, reference_titles, matches
+        ),
+        set_confusion_matrix(candidate_titles, reference_titles, matches),
+    )
+
+
+def test_count_confusion_matrix_without_matches():
+    empty = np.array([], dtype=np.int32)
+    np.testing.assert_array_equal(
+        utils.count_confusion_matrix(3, 4, empty, empty),
+        np.array([[0, 3], [4, 0]]),
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_kendall_tau_b_matches_scipy(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 40))
+    # Small value ranges give ties in both sequences
+    x = rng.integers(0, int(rng.integers(2, 10)), n)
+    y = rng.integers(0, int(rng.integers(2, 10)), n)
+    expected = kendalltau(x, y).statistic
+    if np.isnan(expected):
+        assert np.isnan(utils.kendall_tau_b(x, y))
+    else:
+        assert utils.kendall_tau_b(x, y) == pytest.approx(expected)
+
+
+def test_kendall_tau_b_constant_sequence():
+    assert np.isnan(utils.kendall_tau_b([1, 1, 1], [1, 2, 3]))
+    assert utils.kendall_tau([1, 1, 1], [1, 2, 3]) == 0.0
+
+
+def test_kendall_tau_uses_scipy_for_long_sequences(monkeypatch):
+    monkeypatch.setattr(utils, "KENDALL_TAU_MAX_PAIRWISE", 4)
+    rng = np.random.default_rng(0)
+    x, y = rng.permutation(10), rng.permutation(10)
+    assert utils.kendall_tau(x, y) == round(kendalltau(x, y).statistic, 3)
@@ -0,0 +1,120 @@
+import json
+import pytest
+
+from types import SimpleNamespace
+
+from tex2beam.classes.response_cache import ResponseCache
+from tex2beam.methods import chatgpt
+
+
+class Client:
+    """OpenAI client returning a fixed completion and counting requests."""
+
+    def __init__(self, content, finish_reason="stop"):
+        self.content = content
+        self.finish_reason = finish_reason
+        self.requests = 0
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create)
+        )
+
+    def create(self, **request):
+        self.requests += 1
+        message = SimpleNamespace(content=self.content)
+        choice = SimpleNamespace(
+            message=message, finish_reason=self.finish_reason
+        )
+        return SimpleNamespace(choices=[choice])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.sqlite"))
+
+
+@pytest.fixture
+def use_cache(cache, monkeypatch):
+    monkeypatch.setattr(chatgpt, "cache_enabled", True)
+    monkeypatch.setattr(chatgpt, "cache_refresh", False)
+    monkeypatch.setattr(chatgpt, "get_response_cache", lambda: cache)
+    return cache
+
+
+def use_client(monkeypatch, client):
+    monkeypatch.setattr(chatgpt, "get_client", lambda api_key: client)
+    return client
+
+
+def test_cache_miss(cache):
+    assert cache.get(cache.make_key({"model": "gpt-4o"})) is None
+
+
+def test_cache_hit(cache):
+    key = cache.make_key({"model": "gpt-4o", "messages": []})
+    cache.set(key, "content")
+    assert cache.get(key) == "content"
+    # Keys do not depend on the order of the request parameters
+    assert cache.make_key({"messages": [], "model": "gpt-4o"}) == key
+
+
+def test_cache_set_replaces_content(cache):
+    key = cache.make_key({"model": "gpt-4o"})
+    cache.set(key, "old")
+    cache.set(key, "new")
+    assert cache.get(key) == "new"
+
+
+def test_completion_cache_miss_and_hit(use_cache, monkeypatch):
+    client = use_client(monkeypatch, Client('{"slides": 1}'))
+    assert chatgpt.chatgpt_completion("key", "system", "user") == {
+        "slides": 1
+    }
+    assert chatgpt.chatgpt_completion("key", "system", "user") == {
+        "slides": 1
+    }
+    assert client.requests == 1
+
+
+def test_completion_cache_refresh(use_cache, monkeypatch):
+    use_client(monkeypatch, Client('{"slides": 1}'))
+    chatgpt.chatgpt_completion("key", "system", "user")
+    client = use_client(monkeypatch, Client('{"slides": 2}'))
+    completion = chatgpt.chatgpt_completion(
+        "key", "system", "user", invalidate=True
+    )
+    assert completion == {"slides": 2}
+    assert client.requests == 1
+    # The refreshed response replaces the cached one
+    assert chatgpt.chatgpt_completion("key", "system", "user") == {
+        "slides": 2
+    }
+    assert client.requests == 1
+
+
+def test_completion_incomplete_response_not_cached(use_cache, monkeypatch):
+    content = json.dumps({"slides": 1})
+    client = use_client(monkeypatch, Client(content, finish_reason="length"))
+    chatgpt.chatgpt_completion("key", "system", "user")
+    chatgpt.chatgpt_completion("key", "system", "user")
+    assert client.requests == 2
+
+
+def test_completion_malformed_response_not_cached(use_cache, monkeypatch):
+    client = use_client(monkeypatch, Client('{"slides": '))
+    with pytest.raises(json.JSONDecodeError):
+        chatgpt.chatgpt_completion("key", "system", "user")
+    client = use_client(monkeypatch, Client('{"slides": 1}'))
+    assert chatgpt.chatgpt_completion("key", "system", "user") == {
+        "slides": 1
+    }
+    assert client.requests == 1
+
+
+def test_completion_malformed_cache_entry_ignored(use_cache, monkeypatch):
+    request = chatgpt.build_request("system", "user", 4000)
+    use_cache.set(use_cache.make_key(request), '{"slides": ')
+    client = use_client(monkeypatch, Client('{"slides": 1}'))
+    assert chatgpt.chatgpt_completion("key", "system", "user") == {
+        "slides": 1
+    }
+    assert client.requests == 1
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import pytest
+
+from tex2beam.methods import two_step
+
+
+class CharacterEncoding:
+    """Tokenizer with one token per character."""
+
+    def encode(self, text):
+        return list(text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+class Report:
+    """Report with a single section."""
+
+    title = "Title"
+    authors = ["Author"]
+    affiliations = ["Affiliation"]
+
+    def __init__(self, content):
+        self.section = {
+            "section": "Method",
+            "content": content,
+            "subsections": [],
+        }
+
+    def get_section(self, section_title):
+        return self.section if section_title == "Method" else {}
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    monkeypatch.setattr(two_step, "get_encoding", CharacterEncoding)
+
+
+def test_truncate_tokens_short_text(encoding):
+    assert two_step.truncate_tokens("short", max_tokens=10) == "short"
+
+
+def test_truncate_tokens_long_text(encoding):
+    assert two_step.truncate_tokens("a" * 20, max_tokens=10) == "a" * 10
+
+
+def test_truncate_tokens_with_model_encoding():
+    try:
+        two_step.get_encoding()
+    except Exception as e:
+        pytest.skip(f"Tokenizer not available: {e}")
+    text = "word " * 1000
+    truncated = two_step.truncate_tokens(text, max_tokens=50)
+    assert text.startswith(truncated)
+    assert len(two_step.get_encoding().encode(truncated)) <= 50
+
+
+def test_slide_message_truncates_section(encoding):
+    report = Report("x" * (2 * two_step.MAX_CONTEXT_TOKENS))
+    slide = {"title": "Results", "report_section": "Method"}
+    contexts = {}
+    message = two_step.get_slide_message(slide, report, contexts)
+    assert len(contexts["Method"]) == two_step.MAX_CONTEXT_TOKENS
+    assert json.dumps(report.section).startswith(contexts["Method"])
+    assert message.startswith(f"Context: {contexts['Method']}, Slide: ")
+
+
+def test_slide_message_keeps_short_section(encoding):
+    report = Report("Short section.")
+    slide = {"title": "Results", "report_section": "Method"}
+    contexts = {}
+    two_step.get_slide_message(slide, report, contexts)
+    assert contexts["Method"] == json.dumps(report.section)
+
+
+async def stream(text, size):
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+def parse_outline(text, size):
+    async def collect():
+        sections = two_step.iter_outline_sections(stream(text, size))
+        return [section async for section in sections]
+
+    return asyncio.run(collect())
+
+
+OUTLINE = {
+    "presentation": [
+        {"title": "Introduction", "report_section": "Introduction"},
+        {
+            "title": "Results {and} [tables]",
+            "report_section": "Results",
+            "items": [{"nested": {"value": 1}}, "text, with } braces"],
+        },
+        {"title": "Conclusion", "report_section": None},
+    ]
+}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10000])
+def test_iter_outline_sections(size):
+    text = json.dumps(OUTLINE, indent=2)
+    assert parse_outline(text, size) == OUTLINE["presentation"]
+
+
+def test_iter_outline_sections_compact_json():
+    text = json.dumps(OUTLINE, separators=(",", ":"))
+    assert parse_outline(text, 5) == OUTLINE["presentation"]
+
+
+def test_iter_outline_sections_without_presentation():
+    assert parse_outline(json.dumps({"slides": [{"title": "A"}]}), 4) == []
+
+
+def test_iter_outline_sections_incomplete_stream():
+    text = json.dumps(OUTLINE)
+    truncated = text[: text.index("Conclusion")]
+    assert parse_outline(truncated, 3) == OUTLINE["presentation"][:2]
@@ -0,0 +1,52 @@
+import os
+
+from tex2beam import utils
+
+
+def write(path, content):
+    path.write_text(content)
+    return str(path)
+
+
+def test_flatten_soup_keeps_whitespace(tmp_path):
+    write(tmp_path / "include.tex", "\\cmd{a}\n\\cmd{b}")
+    main = write(tmp_path / "main.tex", "Start \\input{include} end\n")
+    soup = utils.flatten_soup(utils.soupify(main), str(tmp_path))
+    assert str(soup) == "Start \\cmd{a}\n\\cmd{b} end\n"
+
+
+def test_flatten_soup_nested_inputs(tmp_path):
+    write(tmp_path / "b.tex", "B \\emph{world}\n\\input{c}")
+    write(tmp_path / "c.tex", "C text")
+    main = write(tmp_path / "main.tex", "A \\input{b}\n")
+    soup = utils.flatten_soup(utils.soupify(main), str(tmp_path))
+    assert str(soup) == "A B \\emph{world}\nC text\n"
+
+
+def test_resolve_same_file_twice(tmp_path):
+    write(tmp_path / "include.tex", "\\cmd{a}\n\\cmd{b}")
+    main = write(
+        tmp_path / "main.tex", "Start \\input{include} mid \\input{include}\n"
+    )
+    with open(main) as file:
+        soup = utils.resolve(file)
+    assert str(soup) == "Start \\cmd{a}\n\\cmd{b} mid \\cmd{a}\n\\cmd{b}\n"
+    # Each inclusion has its own nodes
+    soup.cmd.delete()
+    assert str(soup) == "Start \n\\cmd{b} mid \\cmd{a}\n\\cmd{b}\n"
+
+
+def test_iter_files(tmp_path):
+    for path in ("a.tex", "b.txt", "x/c.tex", "x/slides/d.tex", "y/e.tex"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+
+    def files(**kwargs):
+        return sorted(
+            os.path.relpath(path, tmp_path)
+            for path in utils.iter_files(str(tmp_path), (".tex",), **kwargs)
+        )
+
+    assert files() == ["a.tex", "x/c.tex", "x/slides/d.tex", "y/e.tex"]
+    assert files(recursive=False) == ["a.tex"]
+    assert files(subfolder="slides") == ["x/slides/d.tex"]
@@ -2,10 +2,53 @@ import logging
 import os
 import TexSoup
 
+from collections import defaultdict
+from functools import cached_property
+
 from tex2beam import utils
 
 logger = logging.getLogger(__name__)
 
+# Commands kept verbatim in the section content
+_LABELS = frozenset(
+    {
+        "label",
+        "footnote",
+        "cite",
+        "citet",
+        "citep",
+        "ref",
+        "$",
+        "emph",
+        "textit",
+        "textbf",
+        "paragraph",
+        "tilde",
+    }
+)
+# Math symbols wrapped in inline math in the section content
+_SYMBOLS = frozenset(
+    {
+        "in",
+        "alpha",
+        "phi",
+        "perp",
+        "cdot",
+        "times",
+        "log",
+        "exp",
+        "right",
+        "sqrt",
+        "theta",
+        "sum",
+        "Phi",
+        "tau",
+        "Theta",
+    }
+)
+# Commands that end the parsing of the sections
+_STOP = frozenset({"bibliography", "bibliographystyle", "appendix"})
+
 
 class LatexBase:
     """Base class for a LaTeX documents."""
@@ -25,17 +68,46 @@ class LatexBase:
         else:
             raise ValueError("Either filepath or source must be provided.")
 
+    def _invalidate(self) -> None:
+        """Clears the cached properties after the soup has been modified."""
+        for cls in type(self).__mro__:
+            for name, attr in vars(cls).items():
+                if isinstance(attr, cached_property):
+                    self.__dict__.pop(name, None)
+
+    @cached_property
+    def _index(self) -> dict:
+        """Indexes the nodes of the soup by name in a single pass.
+
+        Returns:
+            Dictionary of node names and lists of nodes in document order.
+        """
+        index = defaultdict(list)
+        for node in self.soup.descendants:
+            if isinstance(node, TexSoup.data.TexNode):
+                index[node.name].append(node)
+        return index
+
+    def _find_all(self, name: str) -> list:
+        """Returns all nodes with the given name, like `soup.find_all`."""
+        return list(self._index.get(name, []))
+
+    def _find(self, name: str) -> TexSoup.data.TexNode:
+        """Returns the first node with the given name, like `soup.find`."""
+        nodes = self._index.get(name)
+        return nodes[0] if nodes else None
+
     @staticmethod
     def clean_and_merge(content: list) -> str:
         if isinstance(content, str):
             return content
         return " ".join(content).replace("\n", "").strip()
 
-    @property
+    @cached_property
     def bibliography(self):
-        return self.soup.find("thebibliography")
+        return self._find("thebibliography")
 
-    @property
+    @cached_property
     def bibitems(self):
         if not self.bibliography:
             return {}
@@ -53,19 +125,19 @@ class LatexBase:
                 items[key].append(node)
         return items
 
-    @property
+    @cached_property
     def citations(self):
-        return self.soup.find_all("cite")
+        return self._find_all("cite")
 
-    @property
+    @cached_property
     def figures(self):
-        return self.soup.find_all("figure")
+        return self._find_all("figure")
 
-    @property
+    @cached_property
     def tables(self):
-        return self.soup.find_all("table")
+        return self._find_all("table")
 
-    @property
+    @cached_property
     def toc(self) -> list:
         toc = []
         for section in self.sections:
@@ -80,7 +152,7 @@ class LatexBase:
             )
         return toc
 
-    @property
+    @cached_property
     def word_count(self) -> int:
         """Calculates the word count of the report.
 
@@ -92,7 +164,7 @@ class LatexBase:
             return None
         return len(" ".join(self.soup.document.text).split())
 
-    @property
+    @cached_property
     def sections(self) -> list:
         if not self.soup.document:
             logger.error("No document section found.")
@@ -102,37 +174,6 @@ class LatexBase:
         parse = False
         is_section = False
         is_subsection = False
-        labels = [
-            "label",
-            "footnote",
-            "cite",
-            "citet",
-            "citep",
-            "ref",
-            "$",
-            "emph",
-            "textit",
-            "textbf",
-            "paragraph",
-            "tilde",
-        ]
-        symbols = [
-            "in",
-            "alpha",
-            "phi",
-            "perp",
-            "cdot",
-            "times",
-            "log",
-            "exp",
-            "right",
-            "sqrt",
-            "theta",
-            "sum",
-            "Phi",
-            "tau",
-            "Theta",
-        ]
 
         def append(data):
             try:
@@ -143,18 +184,29 @@ class LatexBase:
             except Exception as e:
                 logger.error(f"Error appending data: {e}")
 
+        # Local names are faster to look up in the loop below
+        TexNode = TexSoup.data.TexNode
+        TexText = TexSoup.data.TexText
+        labels, symbols, stop = _LABELS, _SYMBOLS, _STOP
+
         for node in self.soup.document.descendants:
-            if (
-                isinstance(node, TexSoup.data.TexNode)
-                and node.name == "section"
-            ):
-                parse = True
-            if not parse:
+            # Fast path for text, the most common node type
+            if type(node) is TexText:
+                if parse:
+                    append(node.strip("\n"))
                 continue
-            if (
-                isinstance(node, TexSoup.data.TexNode)
-                and node.name == "section"
-            ):
+            if not isinstance(node, TexNode):
+                if not parse:
+                    continue
+                if isinstance(node, str):
+                    append(node.strip("\n"))
+                else:
+                    logger.warning(f"Unknown node: {type(node)}, {node}")
+                continue
+
+            name = node.name
+            if name == "section":
+                parse = True
                 sections.append(
                     {
                         "section": node.string,
@@ -165,10 +217,9 @@ class LatexBase:
                 )
                 is_section = True
                 is_subsection = False
-            elif (
-                isinstance(node, TexSoup.data.TexNode)
-                and node.name == "subsection"
-            ):
+            elif not parse:
+                continue
+            elif name == "subsection":
                 try:
                     sections[-1]["subsections"].append(
                         {
@@ -182,38 +233,18 @@ class LatexBase:
                     logger.error(f"Error adding subsection: {e}")
                 is_section = False
                 is_subsection = True
-            elif isinstance(node, str):
-                append(node.strip("\n"))
-            elif isinstance(node, TexSoup.data.TexNode) and node.name in labels:
+            elif name in labels:
                 append(str(node).strip("\n"))
-            elif (
-                isinstance(node, TexSoup.data.TexNode) and node.name == "figure"
-            ):
-                append(str(node))
-            elif isinstance(node, TexSoup.data.TexNode) and node.name in [
-                "align",
-                "align*",
-            ]:
-                append(str(node))
-            elif (
-                isinstance(node, TexSoup.data.TexNode) and node.name in symbols
-            ):
+            elif name in symbols:
                 append(f"${node}$")
-            elif isinstance(node, TexSoup.data.TexNode) and node.name in [
-                "bibliography",
-                "bibliographystyle",
-                "appendix",
-            ]:
+            elif name in stop:
                 parse = False
-            elif isinstance(node, TexSoup.data.TexNode):
-                append(str(node))
             else:
-                logger.warning(
-                    f"Unknown node: {type(node)}, {node.name}, {node}"
-                )
+                # Figures, align environments and all other commands
+                append(str(node))
         return sections
 
-    @property
+    @cached_property
     def title(self) -> str:
         """Extracts the title from a LaTeX file.
 
@@ -225,12 +256,12 @@ class LatexBase:
         """
         title = None
         try:
-            if self.soup.find("title"):
-                title = self.soup.find("title").text
-            elif self.soup.find("icmltitle"):
-                title = self.soup.find("icmltitle").text
-            elif self.soup.find("icmltitlerunning"):
-                title = self.soup.find("icmltitlerunning").text
+            if self._find("title"):
+                title = self._find("title").text
+            elif self._find("icmltitle"):
+                title = self._find("icmltitle").text
+            elif self._find("icmltitlerunning"):
+                title = self._find("icmltitlerunning").text
             else:
                 logger.debug("No title found.")
         except Exception as e:
@@ -242,7 +273,7 @@ class LatexBase:
             logger.error(f"Error converting title to string: {e}")
         return title
 
-    @property
+    @cached_property
     def authors(self) -> list:
         """Extracts authors from a LaTeX file.
 
@@ -254,10 +285,10 @@ class LatexBase:
         """
         authors = None
         try:
-            if self.soup.find("author"):
-                authors = self.soup.find_all("author")
-            elif self.soup.find("icmlauthor"):
-                authors = self.soup.find_all("icmlauthor")
+            if self._find("author"):
+                authors = self._find_all("author")
+            elif self._find("icmlauthor"):
+                authors = self._find_all("icmlauthor")
         except Exception as e:
             logger.error(f"Error extracting authors: {e}")
         if authors:
@@ -266,7 +297,7 @@ class LatexBase:
             logger.debug("No authors found.")
         return []
 
-    @property
+    @cached_property
     def affiliations(self) -> list:
         """Extracts affiliations from a LaTeX file.
 
@@ -278,15 +309,15 @@ class LatexBase:
         """
         affiliations = []
         try:
-            if self.soup.find("affiliation"):
-                affiliations = self.soup.find_all("affiliation")
-            elif self.soup.find("icmlaffiliation"):
-                affiliations = self.soup.find_all("icmlaffiliation")
+            if self._find("affiliation"):
+                affiliations = self._find_all("affiliation")
+            elif self._find("icmlaffiliation"):
+                affiliations = self._find_all("icmlaffiliation")
         except Exception as e:
             logger.error(f"Error extracting affiliations: {e}")
         return affiliations
 
-    @property
+    @cached_property
     def institutes(self) -> list:
         """Extracts institutes from a LaTeX file.
 
@@ -298,10 +329,10 @@ class LatexBase:
         """
         institutes = None
         try:
-            if self.soup.find("institute"):
-                institutes = self.soup.find_all("institute")
-            elif self.soup.find("icmlinstitute"):
-                institutes = self.soup.find_all("icmlinstitute")
+            if self._find("institute"):
+                institutes = self._find_all("institute")
+            elif self._find("icmlinstitute"):
+                institutes = self._find_all("icmlinstitute")
         except Exception as e:
             logger.error(f"Error extracting institutes: {e}")
         if institutes:
@@ -330,10 +361,20 @@ class LatexBase:
                     return subsection
         return {}
 
-    def resolve_imports(self, file):
-        """Resolves imports in the report."""
+    def resolve_imports(self, file, _root: bool = True):
+        """Resolves imports in the report.
 
-        soup = TexSoup.TexSoup(file, tolerance=1)
+        The outermost file is cleaned before it is parsed. Included files are
+        spliced into the parse tree as-is, and only if any were found is the
+        merged source cleaned and parsed again.
+        """
+        if _root:
+            soup = TexSoup.TexSoup(
+                utils.clean_texfile(file.read()), tolerance=1
+            )
+        else:
+            soup = TexSoup.TexSoup(file, tolerance=1)
+        resolved = False
 
         cwd = os.path.dirname(file.name)
 
@@ -342,36 +383,42 @@ class LatexBase:
                 return filename + ".tex"
             return filename
 
+        def resolve_file(path):
+            with open(path) as include_file:
+                return self.resolve_imports(include_file, _root=False)
+
         # resolve subimports
         for _subimport in soup.find_all("subimport"):
             logger.debug(
                 f"Resolving subimport: {_subimport.args[0]}{_subimport.args[1]}"
             )
             path = _subimport.args[0] + _subimport.args[1]
-            _subimport.replace_with(*self.resolve_imports(open(path)).contents)
+            _subimport.replace_with(*resolve_file(path).contents)
+            resolved = True
 
         # resolve imports
         for _import in soup.find_all("import"):
             filename = check_filename(_import.args[0].string)
             logger.debug(f"Resolving import: {filename}")
-            _import.replace_with(*self.resolve_imports(open(filename)).contents)
+            _import.replace_with(*resolve_file(filename).contents)
+            resolved = True
 
         # resolve includes
         for _include in soup.find_all("include"):
             filename = check_filename(_include.args[0].string)
             logger.debug(f"Resolving include: {filename}")
-            _include.replace_with(
-                *self.resolve_imports(open(filename)).contents
-            )
+            _include.replace_with(*resolve_file(filename).contents)
+            resolved = True
 
         # resolve inputs
         for _input in soup.find_all("input"):
             filename = check_filename(_input.args[0].string)
             logger.debug(f"Resolving input: {filename}")
-            _input.replace_with(
-                self.resolve_imports(open(os.path.join(cwd, filename)))
-            )
+            _input.replace_with(resolve_file(os.path.join(cwd, filename)))
+            resolved = True
 
+        if not _root or not resolved:
+            return soup
         return TexSoup.TexSoup(utils.clean_texfile(str(soup)), tolerance=1)
 
     def get_citation(self, key):
@@ -389,6 +436,7 @@ class LatexBase:
             logger.warning("Bibliography already exists.")
             return
         self.soup.document.insert(-1, bibliography.copy())
+        self._invalidate()
 
     def add_bibitem(self, bibitem):
         if not self.bibliography:
@@ -396,6 +444,7 @@ class LatexBase:
             self.create_bibliography([bibitem])
             return
         self.bibliography.insert(-1, bibitem.copy())
+        self._invalidate()
 
     def create_bibliography(self, bibitems):
         bibliography = TexSoup.TexNode("thebibliography", *bibitems)
@@ -413,6 +462,7 @@ class LatexBase:
     def replace_bibliography(self, bibliography):
         if self.bibliography:
             self.bibliography.replace_with(bibliography.copy())
+            self._invalidate()
         else:
             logger.warning("No bibliography found.")
 
@@ -1,11 +1,24 @@
 import logging
 import TexSoup
 
+from dataclasses import dataclass
+from functools import cached_property
+
 from tex2beam.classes.latex_base import LatexBase
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class PresentationSummary:
+    """Node and word counts of a presentation."""
+
+    n_frames: int = 0
+    n_bullets: int = 0
+    n_sections: int = 0
+    n_words: int = None
+
+
 class LatexPresentation(LatexBase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -14,37 +27,66 @@ class LatexPresentation(LatexBase):
     def __str__(self):
         return (
             f"Presentation Title: {self.title}\n"
-            + f"Frames: {len(self.frames)}\n"
-            + f"Sections: {len(self.sections)}\n"
+            + f"Frames: {self.frame_count}\n"
+            + f"Sections: {self._summary.n_sections}\n"
             + f"Word count: {self.word_count}\n"
             + f"Bullets per frame (mean): {self.bullets_per_frame}\n"
         )
 
-    @property
+    @cached_property
+    def _summary(self) -> PresentationSummary:
+        """Counts frames, bullets, sections and words in a single pass over
+        the document.
+
+        Returns:
+            Summary of the presentation.
+        """
+        document = self.soup.document
+        if not document:
+            logger.error("No document section found.")
+        counts = {"frame": 0, "item": 0, "section": 0}
+        n_words = 0
+        for node in (document or self.soup).descendants:
+            if isinstance(node, str):
+                n_words += len(node.split())
+            elif node.name in counts:
+                counts[node.name] += 1
+        return PresentationSummary(
+            n_frames=counts["frame"],
+            n_bullets=counts["item"],
+            n_sections=counts["section"],
+            n_words=n_words if document else None,
+        )
+
+    @cached_property
     def frames(self) -> list[TexSoup.TexNode]:
-        return self.soup.find_all("frame")
+        return self._find_all("frame")
 
-    @property
+    @cached_property
     def frame_count(self) -> int:
-        return len(self.frames)
+        return self._summary.n_frames
 
-    @property
+    @cached_property
     def bullets(self) -> list[TexSoup.TexNode]:
-        return self.soup.find_all("item")
+        return self._find_all("item")
 
-    @property
+    @cached_property
+    def word_count(self) -> int:
+        return self._summary.n_words
+
+    @cached_property
     def bullets_per_frame(self) -> float:
-        if len(self.frames) == 0:
+        if self.frame_count == 0:
             return 0
-        return len(self.bullets) / len(self.frames)
+        return self._summary.n_bullets / self.frame_count
 
-    @property
+    @cached_property
     def words_per_frame(self) -> float:
         if self.frame_count == 0:
             return 0
         return self.word_count / self.frame_count
 
-    @property
+    @cached_property
     def frame_titles(self) -> list:
         """Extracts the titles of frames from a LaTeX file.
 
@@ -55,9 +97,8 @@ class LatexPresentation(LatexBase):
             Titles of frames.
         """
         try:
-            frames = self.soup.find_all("frame")
             titles = []
-            for frame in frames:
+            for frame in self.frames:
                 title = self.get_frame_title(frame)
                 if title:
                     titles.append(title)
@@ -66,7 +107,7 @@ class LatexPresentation(LatexBase):
             logger.warning(f"No frame titles found!\n{e}")
         return []
 
-    @property
+    @cached_property
     def contents(self) -> list:
         """Extracts the contents of a presentation from a LaTeX file.
 
@@ -78,7 +119,7 @@ class LatexPresentation(LatexBase):
         """
 
         contents = []
-        for frame in self.soup.find_all("frame"):
+        for frame in self.frames:
             if self.title and frame.titlepage:
                 content = []
                 content.append(str(self.title))
@@ -127,7 +168,7 @@ class LatexPresentation(LatexBase):
         previous_frame = None
         previous_content = None
 
-        for i, frame in enumerate(self.soup.find_all("frame")):
+        for i, frame in enumerate(self.frames):
             logger.debug(f"Processing frame {i}.")
             if i == 0:
                 previous_frame = frame
@@ -136,14 +177,18 @@ class LatexPresentation(LatexBase):
 
             content = self.get_frame_contents(frame).split()
             if previous_frame and len(previous_content) > 0:
-                common_content = [c for c in previous_content if c in content]
-                logger.debug(f"Common content: {common_content}")
-                if len(common_content) / len(previous_content) >= threshold:
+                content_set = set(content)
+                common_count = sum(
+                    1 for c in previous_content if c in content_set
+                )
+                logger.debug(f"Common words: {common_count}")
+                if common_count / len(previous_content) >= threshold:
                     logger.debug(f"Removing frame {i}.")
                     previous_frame.delete()
 
             previous_frame = frame
             previous_content = content
+        self._invalidate()
 
     def slide(self, index: int) -> TexSoup.TexNode:
         """Returns a slide from a LaTeX file. Alias for `frame`.
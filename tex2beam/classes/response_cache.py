@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from contextlib import closing
+
+CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "tex2beam", "responses.sqlite"
+)
+
+
+class ResponseCache:
+    """Exact-match on-disk cache of LLM responses backed by SQLite."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        """Initializes the ResponseCache class.
+
+        Args:
+            path: Path to the SQLite database file.
+        """
+        self.path = path
+        cache_folder = os.path.dirname(path)
+        if cache_folder:
+            os.makedirs(cache_folder, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            # WAL allows concurrent readers while a writer is active
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, content TEXT, created_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        """Creates a cache key from the request parameters.
+
+        Args:
+            request: JSON serializable request parameters.
+
+        Returns:
+            SHA-256 hex digest of the request.
+        """
+        return hashlib.sha256(
+            json.dumps(request, sort_keys=True).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> str:
+        """Returns the cached content for a key, or None on a miss."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, content: str) -> None:
+        """Stores the content for a key."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, content, time.time()),
+            )
@@ -1,12 +1,22 @@
 import argparse
+import asyncio
 import logging
 import os
-import re
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dotenv import load_dotenv
+from pathlib import PurePath
 
 from tex2beam import utils
-from tex2beam.methods.two_step import two_step_generation
-from tex2beam.methods.baseline import baseline_generation
+from tex2beam.methods import chatgpt
+from tex2beam.methods.two_step import (
+    two_step_generation,
+    two_step_generation_async,
+)
+from tex2beam.methods.baseline import (
+    baseline_batch_generation,
+    baseline_generation,
+    baseline_generation_async,
+)
 from tex2beam.methods.rag import rag_generation, rag_two_step_generation
 
 
@@ -42,6 +52,13 @@ def generate_presentation(
         presentation = baseline_generation(
             report_path=report_path, api_key=api_key, n_slides=n_slides
         )
+    elif method == "baseline-batch":
+        presentation = baseline_batch_generation(
+            report_paths=[report_path],
+            api_key=api_key,
+            batch_input=os.path.splitext(output_path)[0] + ".batch.jsonl",
+            n_slides=n_slides,
+        )[report_path]
     elif method == "rag":
         presentation["presentation"] = rag_generation(
             report_path=report_path, api_key=api_key, n_slides=n_slides
@@ -60,6 +77,263 @@ def generate_presentation(
     return presentation.get("presentation")
 
 
+async def generate_presentation_async(
+    report_path: str,
+    api_key: str,
+    method: str = "rag",
+    output_path: str = None,
+    n_slides: int = 7,
+    executor: Executor = None,
+    request_sem: asyncio.Semaphore = None,
+) -> None:
+    """Asynchronous version of `generate_presentation`.
+
+    The baseline method runs on the event loop, and parses the report with
+    the executor. The two-step method runs on the event loop, so that its
+    stages overlap with those of other reports, and limits its requests with
+    `request_sem`. The other methods make blocking requests and run in a
+    worker thread.
+    """
+    if method == "two-step":
+        presentation = await two_step_generation_async(
+            latex_path=report_path,
+            api_key=api_key,
+            n_slides=n_slides,
+            sem=request_sem,
+        )
+    elif method == "baseline":
+        presentation = await baseline_generation_async(
+            report_path=report_path,
+            api_key=api_key,
+            n_slides=n_slides,
+            executor=executor,
+        )
+    else:
+        return await asyncio.to_thread(
+            generate_presentation,
+            report_path=report_path,
+            api_key=api_key,
+            method=method,
+            output_path=output_path,
+            n_slides=n_slides,
+        )
+    if not presentation or len(presentation) == 0:
+        raise ValueError("Empty presentation generated")
+    await asyncio.to_thread(
+        utils.write_beamer_presentation,
+        presentation.get("presentation"),
+        output_path,
+    )
+    return presentation.get("presentation")
+
+
+def get_target_file(
+    file_path: str,
+    input_folder: str,
+    output_folder: str,
+    refresh: bool,
+) -> str:
+    """Returns the output path for a LaTeX report in a folder run.
+
+    Args:
+        file_path: Path to the LaTeX file.
+        input_folder: Source folder with the LaTeX reports.
+        output_folder: Target folder to save the LaTeX Beamer presentations.
+        refresh: Convert the report even if the target file exists.
+
+    Returns:
+        Path to the output presentation, or None if the file is not a main
+        LaTeX file or the presentation already exists.
+    """
+    # Check if file is the main LaTeX file
+    try:
+        if not utils.is_main_texfile(file_path):
+            return None
+    except Exception as e:
+        logger.error(f"Error reading {file_path}: {e}")
+
+    # Generate output presentation file path
+    target_file = os.path.join(
+        output_folder,
+        PurePath(file_path).relative_to(input_folder).parts[0] + ".tex",
+    )
+    # check if target file exists
+    if not refresh and os.path.exists(target_file):
+        logger.debug(f"Skipping {target_file} as it already exists.")
+        return None
+    return target_file
+
+
+def dedupe_jobs(file_paths: list, target_files: list) -> dict:
+    """Maps each target file to a single LaTeX report.
+
+    Reports with several main LaTeX files map to the same target file. Only
+    the first of them is converted, so that the conversions do not overwrite
+    each other.
+
+    Args:
+        file_paths: Paths to the LaTeX files.
+        target_files: Output paths of the LaTeX files, or None for the files
+          that are skipped.
+
+    Returns:
+        Dictionary of LaTeX file paths by target file.
+    """
+    jobs = {}
+    for file_path, target_file in zip(file_paths, target_files):
+        if not target_file:
+            continue
+        if target_file in jobs:
+            logger.warning(
+                f"Skipping {file_path}, as {jobs[target_file]} is already "
+                f"converted to {target_file}."
+            )
+            continue
+        jobs[target_file] = file_path
+    return jobs
+
+
+async def convert_report(
+    file_path: str,
+    target_file: str,
+    api_key: str,
+    method: str,
+    sem: asyncio.Semaphore,
+    executor: Executor = None,
+    request_sem: asyncio.Semaphore = None,
+):
+    """Converts a LaTeX report in a folder run.
+
+    Args:
+        file_path: Path to the LaTeX file.
+        target_file: Path to the output presentation.
+        api_key: OpenAI API key.
+        method: Method to use for generating the presentation.
+        sem: Semaphore limiting the number of concurrent conversions.
+        executor: Executor used for parsing the reports.
+        request_sem: Semaphore limiting the number of concurrent requests,
+          shared by all reports.
+    """
+    async with sem:
+        try:
+            logger.debug(f"Converting {file_path}.")
+            await generate_presentation_async(
+                report_path=file_path,
+                output_path=target_file,
+                api_key=api_key,
+                method=method,
+                executor=executor,
+                request_sem=request_sem,
+            )
+        except Exception as e:
+            logger.error(f"Error generating presentation for {file_path}: {e}")
+
+
+async def convert_reports(
+    file_paths: list,
+    input_folder: str,
+    output_folder: str,
+    api_key: str,
+    method: str,
+    refresh: bool,
+    max_concurrent: int = 8,
+    workers: int = None,
+    max_requests: int = 16,
+) -> None:
+    """Converts LaTeX reports concurrently.
+
+    Reports are parsed in separate processes, as parsing is CPU-bound, while
+    the requests run concurrently on the event loop.
+
+    Args:
+        file_paths: Paths to the LaTeX files.
+        input_folder: Source folder with the LaTeX reports.
+        output_folder: Target folder to save the LaTeX Beamer presentations.
+        api_key: OpenAI API key.
+        method: Method to use for generating the presentations.
+        refresh: Convert the reports even if the target files exist.
+        max_concurrent: Maximum number of concurrent conversions.
+        workers: Number of processes used for parsing the reports.
+        max_requests: Maximum number of concurrent requests in total.
+    """
+    target_files = await asyncio.gather(
+        *[
+            asyncio.to_thread(
+                get_target_file, file_path, input_folder, output_folder, refresh
+            )
+            for file_path in file_paths
+        ]
+    )
+    jobs = dedupe_jobs(file_paths, target_files)
+    if not jobs:
+        logger.info("No reports to convert.")
+        return
+
+    sem = asyncio.Semaphore(max_concurrent)
+    request_sem = asyncio.Semaphore(max_requests)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        await asyncio.gather(
+            *[
+                convert_report(
+                    file_path,
+                    target_file,
+                    api_key,
+                    method,
+                    sem,
+                    executor,
+                    request_sem,
+                )
+                for target_file, file_path in jobs.items()
+            ]
+        )
+
+
+def convert_batch(
+    file_paths: list,
+    input_folder: str,
+    output_folder: str,
+    api_key: str,
+    refresh: bool = False,
+    workers: int = None,
+) -> None:
+    """Converts LaTeX reports with the Baseline method in a single OpenAI
+    batch.
+
+    Args:
+        file_paths: Paths to the LaTeX files.
+        input_folder: Source folder with the LaTeX reports.
+        output_folder: Target folder to save the LaTeX Beamer presentations.
+        api_key: OpenAI API key.
+        refresh: Convert the reports even if the target files exist.
+        workers: Number of processes used for parsing the reports.
+    """
+    jobs = dedupe_jobs(
+        file_paths,
+        [
+            get_target_file(file_path, input_folder, output_folder, refresh)
+            for file_path in file_paths
+        ],
+    )
+    if not jobs:
+        logger.info("No reports to convert.")
+        return
+
+    presentations = baseline_batch_generation(
+        report_paths=list(jobs.values()),
+        api_key=api_key,
+        batch_input=os.path.join(output_folder, "batch_input.jsonl"),
+        workers=workers,
+    )
+    for target_file, file_path in jobs.items():
+        presentation = presentations.get(file_path)
+        if not presentation:
+            logger.error(f"Error generating presentation for {file_path}.")
+            continue
+        utils.write_beamer_presentation(
+            presentation.get("presentation"), target_file
+        )
+
+
 def convert_folder(
     input_folder: str,
     output_folder: str,
@@ -67,6 +341,8 @@ def convert_folder(
     method: str,
     refresh: bool = False,
     subfolder: str = None,
+    max_concurrent: int = 8,
+    workers: int = None,
 ):
     """Walks through a folder and generates LaTex Beamer presentations from
     LaTeX reports.
@@ -75,47 +351,37 @@ def convert_folder(
         input_folder: Source folder with the LaTeX reports.
         output_folder: Target folder to save the LaTeX Beamer presentations.
         api_key: OpenAI API key.
+        max_concurrent: Maximum number of reports converted concurrently.
+        workers: Number of processes used for parsing the reports.
     """
     logger.debug("Starting folder walk.")
+    file_paths = []
 
     def callback(file_path):
         if subfolder and subfolder not in file_path:
             return
         if file_path.endswith(".tex"):
-            # Check if file is the main LaTeX file
-            try:
-                if not re.search(
-                    r"\\begin{document}", open(file_path).read(), re.IGNORECASE
-                ):
-                    return
-            except Exception as e:
-                logger.error(f"Error reading {file_path}: {e}")
-
-            # Generate output presentation file path
-            target_file = os.path.join(
-                output_folder,
-                file_path.replace(input_folder, "").split("/")[1] + ".tex",
-            )
-            # check if target file exists
-            if not refresh and os.path.exists(target_file):
-                logger.debug(f"Skipping {target_file} as it already exists.")
-                return
-
-            try:
-                logger.debug(f"Converting {file_path}.")
-                generate_presentation(
-                    report_path=file_path,
-                    output_path=target_file,
-                    api_key=api_key,
-                    method=method,
-                )
-            except Exception as e:
-                logger.error(
-                    f"Error generating presentation for {file_path}: {e}"
-                )
+            file_paths.append(file_path)
 
     logger.debug(f"Converting LaTeX files in {input_folder}.")
     utils.folder_walker(input_folder, callback)
+    if method == "baseline-batch":
+        convert_batch(
+            file_paths, input_folder, output_folder, api_key, refresh, workers
+        )
+        return
+    asyncio.run(
+        convert_reports(
+            file_paths,
+            input_folder,
+            output_folder,
+            api_key,
+            method,
+            refresh,
+            max_concurrent=max_concurrent,
+            workers=workers,
+        )
+    )
 
 
 def main(args: argparse.Namespace) -> None:
@@ -125,6 +391,9 @@ def main(args: argparse.Namespace) -> None:
         args: Arguments from command-line call.
     """
     logger.info("Starting main function.")
+    # Refreshed outputs are generated anew, and replace the cached responses
+    chatgpt.cache_enabled = not args.no_cache
+    chatgpt.cache_refresh = args.refresh
     if args.source_folder:
         convert_folder(
             input_folder=args.source_folder,
@@ -133,6 +402,8 @@ def main(args: argparse.Namespace) -> None:
             api_key=args.api_key,
             refresh=args.refresh,
             subfolder="paper-latex",
+            max_concurrent=args.max_concurrent,
+            workers=args.workers,
         )
     elif args.pdf_path:
         generate_presentation(
@@ -168,14 +439,39 @@ def parse_args() -> argparse.Namespace:
         help="Refresh all LaTeX files in the target folder",
         default=False,
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the on-disk LLM response cache",
+        default=False,
+    )
     parser.add_argument(
         "-m",
         "--method",
         type=str,
         help="Method to use for generating the Beamer presentation",
-        choices=["baseline", "rag", "two-step", "rag-two-step"],
+        choices=[
+            "baseline",
+            "baseline-batch",
+            "rag",
+            "two-step",
+            "rag-two-step",
+        ],
         default="two-step",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of processes used for parsing the reports",
+        default=None,
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        help="Maximum number of reports converted concurrently",
+        default=8,
+    )
     # latex-path and source-folder are mutually exclusive
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
@@ -1,21 +1,17 @@
+import asyncio
 import logging
 
+from concurrent.futures import Executor, ProcessPoolExecutor
 from tex2beam.classes.latex_report import LatexReport
-from tex2beam.methods.chatgpt import chatgpt_completion
+from tex2beam.methods.chatgpt import (
+    chatgpt_batch_completion,
+    chatgpt_completion,
+    chatgpt_completion_async,
+)
 
 logger = logging.getLogger(__name__)
 
-
-def chatgpt_chat(report: str, api_key: str, n_slides: int = 7) -> dict:
-    """Generates a Beamer presentation from a report.
-
-    Args:
-        report: Report.
-
-    Returns:
-        Beamer presentation.
-    """
-    system_message = """
+SYSTEM_MESSAGE = """
     Given an academic report in LaTeX format, your task is to create a summary 
     suitable for a LaTeX Beamer presentation with {n_slides} slides. 
     The report consists of several sections, including Introduction, 
@@ -46,10 +42,33 @@ def chatgpt_chat(report: str, api_key: str, n_slides: int = 7) -> dict:
     LaTeX Beamer presentation outline with {n_slides} slides as described. 
     The output shall be in JSON format: 
     {{'presentation': 'LaTeX Beamer code for the presentation.'}}
-    """
+"""
+
+
+def chatgpt_chat(report: str, api_key: str, n_slides: int = 7) -> dict:
+    """Generates a Beamer presentation from a report.
 
+    Args:
+        report: Report.
+
+    Returns:
+        Beamer presentation.
+    """
     presentation = chatgpt_completion(
-        system_message=system_message.format(n_slides=n_slides),
+        system_message=SYSTEM_MESSAGE.format(n_slides=n_slides),
+        user_message=report,
+        api_key=api_key,
+    )
+
+    return presentation
+
+
+async def chatgpt_chat_async(
+    report: str, api_key: str, n_slides: int = 7
+) -> dict:
+    """Asynchronous version of `chatgpt_chat`."""
+    presentation = await chatgpt_completion_async(
+        system_message=SYSTEM_MESSAGE.format(n_slides=n_slides),
         user_message=report,
         api_key=api_key,
     )
@@ -57,6 +76,16 @@ def chatgpt_chat(report: str, api_key: str, n_slides: int = 7) -> dict:
     return presentation
 
 
+def check_presentation(presentation: dict):
+    # Completions are parsed JSON, which may lack the presentation
+    if isinstance(presentation, dict) and presentation.get("presentation"):
+        return presentation
+    else:
+        logger.error(
+            "Generated presentation is empty. Please check the input report and try again."
+        )
+
+
 def baseline_generation(report_path: str, api_key: str, n_slides: int = 7):
     """Generates a Beamer presentation from a report using the Baseline method.
 
@@ -69,9 +98,104 @@ def baseline_generation(report_path: str, api_key: str, n_slides: int = 7):
     """
     report = LatexReport(report_path)
     presentation = chatgpt_chat(str(report.soup), api_key, n_slides=n_slides)
-    if presentation and len(presentation.get("presentation")) > 0:
-        return presentation
-    else:
-        logger.error(
-            "Generated presentation is empty. Please check the input report and try again."
+    return check_presentation(presentation)
+
+
+def read_report(report_path: str) -> str:
+    """Parses a report and returns its LaTeX source with imports resolved.
+
+    Parsing is CPU-bound, so this runs in worker processes during folder
+    runs. Only the source string is sent back to the main process.
+
+    Args:
+        report_path: Path to the report.
+
+    Returns:
+        LaTeX source of the report.
+    """
+    return str(LatexReport(report_path).soup)
+
+
+def try_read_report(report_path: str) -> str:
+    """Parses a report like `read_report`, but logs parsing errors.
+
+    Used in batch runs, so that a single report that cannot be parsed does
+    not stop the whole batch.
+
+    Args:
+        report_path: Path to the report.
+
+    Returns:
+        LaTeX source of the report, or None if the report cannot be parsed.
+    """
+    try:
+        return read_report(report_path)
+    except Exception as e:
+        logger.error(f"Error reading {report_path}: {e}")
+        return None
+
+
+async def baseline_generation_async(
+    report_path: str,
+    api_key: str,
+    n_slides: int = 7,
+    executor: Executor = None,
+):
+    """Asynchronous version of `baseline_generation`.
+
+    Args:
+        report_path: Path to the report.
+        api_key: OpenAI API key.
+        executor: Executor used for parsing the report. Defaults to the
+          default thread pool of the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(executor, read_report, report_path)
+    presentation = await chatgpt_chat_async(
+        report, api_key, n_slides=n_slides
+    )
+    return check_presentation(presentation)
+
+
+def baseline_batch_generation(
+    report_paths: list,
+    api_key: str,
+    batch_input: str,
+    n_slides: int = 7,
+    workers: int = None,
+) -> dict:
+    """Generates Beamer presentations from reports using the Baseline method
+    and the OpenAI Batch API.
+
+    Args:
+        report_paths: Paths to the reports.
+        api_key: OpenAI API key.
+        batch_input: Path to the batch input JSONL file.
+        workers: Number of processes used for parsing the reports.
+
+    Returns:
+        Dictionary of report paths and Beamer presentations. Reports that
+        cannot be parsed are skipped and have no presentation.
+    """
+    system_message = SYSTEM_MESSAGE.format(n_slides=n_slides)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reports = executor.map(try_read_report, report_paths)
+        messages = {
+            report_path: (system_message, report)
+            for report_path, report in zip(report_paths, reports)
+            if report is not None
+        }
+    if not messages:
+        logger.error("None of the reports could be parsed.")
+        return dict.fromkeys(report_paths)
+    completions = chatgpt_batch_completion(
+        api_key=api_key, messages=messages, batch_input=batch_input
+    )
+    return {
+        report_path: (
+            check_presentation(completions.get(report_path))
+            if report_path in messages
+            else None
         )
+        for report_path in report_paths
+    }
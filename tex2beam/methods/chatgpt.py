@@ -1,21 +1,359 @@
+import asyncio
+import httpx
 import json
-from openai import OpenAI
+import logging
+import os
+import time
+import weakref
 
+from functools import lru_cache
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
 
-def chatgpt_completion(
-    api_key: str, system_message: str, user_message: str, max_tokens=4000
+from tex2beam.classes.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4o"
+# Maximum number of pooled connections shared by the asynchronous requests
+MAX_CONNECTIONS = 50
+# Retries of rate limited, timed out and failed requests, with exponential
+# backoff and jitter
+MAX_RETRIES = 6
+# Timeout in seconds of each request attempt
+TIMEOUT = 60
+# Set to False to bypass the on-disk response cache
+cache_enabled = True
+# Set to True to ignore cached responses, but still cache the new responses
+cache_refresh = False
+
+# Asynchronous clients by event loop and API key
+_async_clients = weakref.WeakKeyDictionary()
+
+
+@lru_cache(maxsize=8)
+def get_client(api_key: str) -> OpenAI:
+    """Returns a shared OpenAI client for the API key.
+
+    Args:
+        api_key: OpenAI API key.
+
+    Returns:
+        OpenAI client.
+    """
+    return OpenAI(api_key=api_key, max_retries=MAX_RETRIES, timeout=TIMEOUT)
+
+
+def get_async_client(api_key: str) -> AsyncOpenAI:
+    """Returns a shared asynchronous OpenAI client for the API key.
+
+    The client keeps a pool of connections, so concurrent requests reuse
+    connections instead of opening a new one for each request. Connections
+    cannot be shared between event loops, so each running event loop gets
+    its own client.
+
+    Args:
+        api_key: OpenAI API key.
+
+    Returns:
+        Asynchronous OpenAI client.
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if api_key not in clients:
+        clients[api_key] = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=MAX_RETRIES,
+            timeout=TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                )
+            ),
+        )
+    return clients[api_key]
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> ResponseCache:
+    """Returns the shared on-disk response cache."""
+    return ResponseCache()
+
+
+def build_request(
+    system_message: str, user_message: str, max_tokens: int = 4000
 ) -> dict:
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        response_format={"type": "json_object"},
-        temperature=0.2,
-        max_tokens=max_tokens,
-        n=1,
-        stop=None,
-        messages=[
+    """Builds the arguments of a chat completion request.
+
+    Args:
+        system_message: System message.
+        user_message: User message.
+        max_tokens: Maximum number of tokens in the completion.
+
+    Returns:
+        Arguments for `chat.completions.create`.
+    """
+    return {
+        "model": MODEL,
+        "response_format": {"type": "json_object"},
+        "temperature": 0.2,
+        "max_tokens": max_tokens,
+        "n": 1,
+        "stop": None,
+        "messages": [
             {"role": "system", "content": system_message},
             {"role": "user", "content": user_message},
         ],
+    }
+
+
+def parse_cached_response(content: str) -> dict:
+    """Parses a cached response.
+
+    Args:
+        content: Cached completion content.
+
+    Returns:
+        Parsed completion, or None if the content is not valid JSON.
+    """
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        logger.warning("Ignoring malformed cached response.")
+        return None
+
+
+def is_complete(finish_reason: str) -> bool:
+    """Checks if a completion finished on its own, so that it can be cached.
+
+    Completions cut off by the token limit or the content filter are not
+    cached, so that they are requested again.
+
+    Args:
+        finish_reason: Finish reason of the completion.
+
+    Returns:
+        True if the completion is complete.
+    """
+    if finish_reason != "stop":
+        logger.warning(
+            f"Incomplete response (finish reason: {finish_reason}), "
+            "not caching it."
+        )
+        return False
+    return True
+
+
+def chatgpt_completion(
+    api_key: str,
+    system_message: str,
+    user_message: str,
+    max_tokens=4000,
+    invalidate: bool = None,
+) -> dict:
+    """Generates a chat completion in JSON format.
+
+    Responses are cached on disk, keyed by the full request. Only complete
+    responses that parse as JSON are cached.
+
+    Args:
+        api_key: OpenAI API key.
+        system_message: System message.
+        user_message: User message.
+        max_tokens: Maximum number of tokens in the completion.
+        invalidate: Ignore a cached response and replace it with a new one.
+          Defaults to `cache_refresh`.
+
+    Returns:
+        Parsed completion.
+    """
+    request = build_request(system_message, user_message, max_tokens)
+    cache = get_response_cache() if cache_enabled else None
+    if invalidate is None:
+        invalidate = cache_refresh
+    if cache:
+        key = cache.make_key(request)
+        content = None if invalidate else cache.get(key)
+        completion = parse_cached_response(content) if content else None
+        if completion is not None:
+            logger.debug("Response read from cache.")
+            return completion
+
+    client = get_client(api_key)
+    response = client.chat.completions.create(**request)
+    choice = response.choices[0]
+    content = choice.message.content
+    # Only responses that are complete and parse are cached
+    completion = json.loads(content)
+    if cache and is_complete(choice.finish_reason):
+        cache.set(key, content)
+    return completion
+
+
+async def chatgpt_completion_async(
+    api_key: str,
+    system_message: str,
+    user_message: str,
+    max_tokens=4000,
+    invalidate: bool = None,
+) -> dict:
+    """Asynchronous version of `chatgpt_completion`."""
+    request = build_request(system_message, user_message, max_tokens)
+    cache = get_response_cache() if cache_enabled else None
+    if invalidate is None:
+        invalidate = cache_refresh
+    if cache:
+        key = cache.make_key(request)
+        content = (
+            None if invalidate else await asyncio.to_thread(cache.get, key)
+        )
+        completion = parse_cached_response(content) if content else None
+        if completion is not None:
+            logger.debug("Response read from cache.")
+            return completion
+
+    client = get_async_client(api_key)
+    response = await client.chat.completions.create(**request)
+    choice = response.choices[0]
+    content = choice.message.content
+    # Only responses that are complete and parse are cached
+    completion = json.loads(content)
+    if cache and is_complete(choice.finish_reason):
+        await asyncio.to_thread(cache.set, key, content)
+    return completion
+
+
+async def chatgpt_completion_stream(
+    api_key: str,
+    system_message: str,
+    user_message: str,
+    max_tokens=4000,
+    invalidate: bool = None,
+):
+    """Streams a chat completion in JSON format.
+
+    Yields the unparsed content as it is generated, so that callers can act
+    on the first part of the response before the rest is complete. Cached
+    responses are yielded in one piece.
+
+    Args:
+        api_key: OpenAI API key.
+        system_message: System message.
+        user_message: User message.
+        max_tokens: Maximum number of tokens in the completion.
+        invalidate: Ignore a cached response and replace it with a new one.
+          Defaults to `cache_refresh`.
+
+    Yields:
+        Parts of the completion content.
+    """
+    request = build_request(system_message, user_message, max_tokens)
+    cache = get_response_cache() if cache_enabled else None
+    if invalidate is None:
+        invalidate = cache_refresh
+    if cache:
+        key = cache.make_key(request)
+        content = (
+            None if invalidate else await asyncio.to_thread(cache.get, key)
+        )
+        if content and parse_cached_response(content) is not None:
+            logger.debug("Response read from cache.")
+            yield content
+            return
+
+    client = get_async_client(api_key)
+    stream = await client.chat.completions.create(**request, stream=True)
+    parts = []
+    finish_reason = None
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        finish_reason = chunk.choices[0].finish_reason or finish_reason
+        if delta:
+            parts.append(delta)
+            yield delta
+    if cache and is_complete(finish_reason):
+        content = "".join(parts)
+        # Only responses that are complete and parse are cached
+        try:
+            json.loads(content)
+        except json.JSONDecodeError:
+            logger.warning("Malformed JSON response, not caching it.")
+            return
+        await asyncio.to_thread(cache.set, key, content)
+
+
+def chatgpt_batch_completion(
+    api_key: str,
+    messages: dict,
+    batch_input: str,
+    max_tokens: int = 4000,
+    poll_interval: int = 60,
+) -> dict:
+    """Runs chat completions through the OpenAI Batch API.
+
+    The Batch API is cheaper and has higher rate limits than real-time
+    requests, but may take up to 24 hours to complete.
+
+    Args:
+        api_key: OpenAI API key.
+        messages: Dictionary of request IDs and (system message, user
+          message) tuples.
+        batch_input: Path to the batch input JSONL file.
+        max_tokens: Maximum number of tokens in each completion.
+        poll_interval: Seconds between batch status checks.
+
+    Returns:
+        Dictionary of request IDs and parsed completions. Failed requests are
+        missing from the dictionary.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(batch_input)), exist_ok=True)
+    with open(batch_input, "w") as file:
+        for custom_id, (system_message, user_message) in messages.items():
+            request = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": build_request(system_message, user_message, max_tokens),
+            }
+            file.write(json.dumps(request) + "\n")
+
+    client = get_client(api_key)
+    with open(batch_input, "rb") as file:
+        input_file = client.files.create(file=file, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
     )
-    return json.loads(response.choices[0].message.content)
+    logger.info(f"Created batch {batch.id} with {len(messages)} requests.")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        logger.debug(f"Batch {batch.id} status: {batch.status}")
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} {batch.status}.")
+
+    completions = {}
+    if batch.output_file_id is None:
+        # All requests of the batch failed
+        logger.error(
+            f"Batch {batch.id} has no output, see error file "
+            f"{batch.error_file_id}."
+        )
+        return completions
+    output = client.files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        result = json.loads(line)
+        custom_id = result["custom_id"]
+        try:
+            if result.get("error"):
+                raise ValueError(result["error"])
+            body = result["response"]["body"]
+            completions[custom_id] = json.loads(
+                body["choices"][0]["message"]["content"]
+            )
+        except Exception as e:
+            logger.error(f"Error in batch request {custom_id}: {e}")
+    return completions
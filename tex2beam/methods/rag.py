@@ -1,3 +1,4 @@
+import asyncio
 import chromadb
 import json
 import hashlib
@@ -5,30 +6,161 @@ import logging
 import os
 import re
 import tiktoken
+import uuid
 
 from dotenv import load_dotenv
+from functools import lru_cache
 from llama_index.core import (
     Settings,
     Document,
     VectorStoreIndex,
     StorageContext,
     PromptTemplate,
+    QueryBundle,
 )
+from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
 
+from tex2beam import utils
 from tex2beam.classes.latex_report import LatexReport
+from tex2beam.classes.response_cache import ResponseCache
+from tex2beam.methods import chatgpt
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+ENCODING = tiktoken.encoding_for_model("gpt-4o")
+# Longest text whose tokens are cached
+MAX_CACHED_TOKENIZE_LENGTH = 256
+
+
+@lru_cache(maxsize=4096)
+def tokenize_cached(text: str) -> list:
+    return ENCODING.encode(text)
+
+
+def tokenize(text: str) -> list:
+    """Tokenizes text for chunking.
+
+    The tokenizer is called many times while chunking, often on the same
+    short strings, e.g. section titles and metadata, so the tokens of short
+    strings are cached.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list: Tokens.
+    """
+    if len(text) <= MAX_CACHED_TOKENIZE_LENGTH:
+        return tokenize_cached(text)
+    return ENCODING.encode(text)
+
+
 #
 Settings.llm = OpenAI(model="gpt-4o", temperature=0.0)
 Settings.chunk_size = 2048
 Settings.chunk_overlap = 64
-Settings.tokenizer = tiktoken.encoding_for_model("gpt-4o")
+Settings.tokenizer = tokenize
+
+# Backslashes that do not start a valid JSON escape sequence
+UNESCAPED_BACKSLASH_RE = re.compile(
+    r'(?<!\\)\\(?!["\\/bfnrt]|u[0-9a-fA-F]{4})'
+)
+# Line with the document class of a slide
+DOCUMENTCLASS_RE = re.compile(r"\\documentclass.*\n")
+
+EMBED_MODEL = "text-embedding-3-small"
+# Maximum number of inputs in a single embedding request
+EMBED_BATCH_SIZE = 256
+# Maximum cosine distance between similar queries in the semantic cache
+SEMANTIC_CACHE_THRESHOLD = 0.08
+
+
+def extract_json_block(text: str) -> str:
+    """Returns the contents of the first JSON code block in a text.
+
+    Args:
+        text (str): Text with a ```json ... ``` code block.
+
+    Returns:
+        str: Contents of the code block, or None if there is none.
+    """
+    start = text.find("```json")
+    if start == -1:
+        return None
+    start += len("```json")
+    end = text.find("```", start)
+    if end == -1:
+        return None
+    return text[start:end]
+
+
+async def read_response(response) -> str:
+    """Reads the text of a query response.
+
+    A streamed response is read only until its JSON code block is complete,
+    so any trailing text after the block is not waited for.
+
+    Args:
+        response: Query engine response, streamed or not.
+
+    Returns:
+        str: Response text.
+    """
+    if not hasattr(response, "async_response_gen"):
+        return str(response)
+    tokens = []
+    response_gen = response.async_response_gen()
+    try:
+        async for token in response_gen:
+            tokens.append(token)
+            # The closing fence of the code block ends with a backtick
+            if "`" in token and extract_json_block("".join(tokens)):
+                break
+    finally:
+        await response_gen.aclose()
+    return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_chroma_client(collection_path: str) -> chromadb.ClientAPI:
+    """Returns a shared ChromaDB client for the collection path.
+
+    Opening a persistent client is costly, so one client is reused for all
+    reports stored under the same path.
+
+    Args:
+        collection_path (str): Path to the ChromaDB collections.
+
+    Returns:
+        chromadb.ClientAPI: ChromaDB client.
+    """
+    return chromadb.PersistentClient(collection_path)
+
+
+@lru_cache(maxsize=8)
+def get_embed_model(api_key: str) -> OpenAIEmbedding:
+    """Returns a shared embedding model for the API key.
+
+    Chunks are embedded in batches of up to `EMBED_BATCH_SIZE` inputs per
+    request, instead of one request for every few chunks.
+
+    Args:
+        api_key (str): OpenAI API key.
+
+    Returns:
+        OpenAIEmbedding: Embedding model.
+    """
+    return OpenAIEmbedding(
+        model=EMBED_MODEL,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        max_retries=6,
+        api_key=api_key,
+    )
 
 
 class RAG:
@@ -49,11 +181,20 @@ class RAG:
         self.report_path = report_path
         self.report = LatexReport(self.report_path)
         self.collection_path = collection_path
-        self.collection_title = hashlib.md5(report_path.encode()).hexdigest()
-        self.chroma_client = chromadb.PersistentClient(self.collection_path)
+        # The collection is keyed by the contents of the report and the
+        # embedding model, so that a modified report gets new embeddings
+        self.collection_title = hashlib.blake2b(
+            (report_path + EMBED_MODEL + str(self.report.soup)).encode(),
+            digest_size=16,
+        ).hexdigest()
+        self.chroma_client = get_chroma_client(self.collection_path)
         self.chroma_collection = self.chroma_client.get_or_create_collection(
             self.collection_title
         )
+        # Responses to earlier queries, shared by all reports
+        self.prompt_cache = self.chroma_client.get_or_create_collection(
+            "prompt_cache", metadata={"hnsw:space": "cosine"}
+        )
         self.vector_store = ChromaVectorStore(
             chroma_collection=self.chroma_collection
         )
@@ -63,24 +204,11 @@ class RAG:
         self.index = None
         self.query_engine = None
         self.presentation = None
-        os.environ["OPENAI_API_KEY"] = api_key
-
-    def is_valid_json(self, json_string) -> bool:
-        """Check if the provided string is a valid JSON.
-
-        Args:
-            json_string (str): JSON string.
-
-        Returns:
-            bool: True if the JSON string is valid, False otherwise.
-        """
-        try:
-            json.loads(json_string)
-        except ValueError as e:
-            logger.error(f"Invalid JSON: {e}")
-            logger.debug(f"JSON string: {json_string}")
-            return False
-        return True
+        # The environment is shared by all threads, so it is only written if
+        # the key changes
+        if os.environ.get("OPENAI_API_KEY") != api_key:
+            os.environ["OPENAI_API_KEY"] = api_key
+        Settings.embed_model = get_embed_model(api_key)
 
     def sanitize_json_string(self, json_string) -> str:
         """Sanitize the JSON string to escape control characters and fix common
@@ -94,67 +222,282 @@ class RAG:
         """
         # If the content only contains single and double \ and \\, they need to
         # be escaped as \\ and \\\\.
-        json_string = re.sub(
-            r'(?<!\\)\\(?!["\\/bfnrt]|u[0-9a-fA-F]{4})', r"\\\\", json_string
-        )
+        json_string = UNESCAPED_BACKSLASH_RE.sub(r"\\\\", json_string)
         return json_string
 
     def extract_and_validate_json(self, response):
-        """Extract JSON content from the response and validate it."""
+        """Extract JSON content from the response and parse it.
+
+        Args:
+            response: Query engine response.
+
+        Returns:
+            Parsed JSON content, or None if no valid JSON content was found.
+        """
+        text = str(response)
         try:
-            if response.__str__().startswith('"slide_content"'):
-                slide_content = json.loads(response.__str__())
-                return slide_content
+            if text.startswith('"slide_content"'):
+                return json.loads(text)
         except json.JSONDecodeError as e:
             logger.error(
-                f"Failed to parse response as JSON.\n{response}\n\n{e}"
+                f"Failed to parse response as JSON.\n{text}\n\n{e}"
             )
             return None
         except Exception as e:
             logger.error(
-                f"Unexpected error during JSON parsing.\n{response}\n\n{e}"
+                f"Unexpected error during JSON parsing.\n{text}\n\n{e}"
             )
             return None
         try:
-            match = re.search(r"```json(.*?)```", response.__str__(), re.DOTALL)
-            if match:
-                slide_content = match.group(1).strip()
+            slide_content = extract_json_block(text)
+            if slide_content is not None:
+                slide_content = slide_content.strip()
                 logging.debug(f"Extracted slide content: {slide_content}")
 
                 # Sanitize the extracted JSON string
                 slide_content = self.sanitize_json_string(slide_content)
 
-                # Validate the JSON structure
-                if self.is_valid_json(slide_content):
-                    return slide_content
-                else:
-                    logging.error(f"Invalid JSON content: {slide_content}")
+                try:
+                    return json.loads(slide_content)
+                except ValueError as e:
+                    logging.error(f"Invalid JSON content: {slide_content}\n{e}")
             else:
-                logging.error(
-                    f"Regex did not match. Response: {response.__str__()}"
-                )
+                logging.error(f"No JSON code block found. Response: {text}")
         except Exception as e:
             logging.error(
-                f"Failed to extract and validate JSON contents.\n{response}\n\n{e}"
+                f"Failed to extract and validate JSON contents.\n{text}\n\n{e}"
             )
         return None
 
+    @staticmethod
+    def get_prompt_templates(query_engine) -> dict:
+        """Returns the prompt templates of a query engine by name."""
+        return {
+            name: prompt.get_template()
+            for name, prompt in query_engine.get_prompts().items()
+        }
+
+    def get_cache_key(self, query_engine, question: str, **kwargs) -> str:
+        """Creates a response cache key for a query.
+
+        Args:
+            query_engine: Query engine with the prompt templates set.
+            question (str): Query.
+            **kwargs: Prompt template variables that are not part of the
+              templates, e.g. partially formatted variables.
+
+        Returns:
+            str: Cache key.
+        """
+        return ResponseCache.make_key(
+            {
+                "collection": self.collection_title,
+                "model": Settings.llm.model,
+                "prompts": self.get_prompt_templates(query_engine),
+                "kwargs": kwargs,
+                "question": question,
+            }
+        )
+
+    def get_semantic_cache_scope(self, query_engine, **kwargs) -> str:
+        """Creates the scope of a query in the semantic cache.
+
+        Only responses to queries with the same prompt templates, number of
+        slides and slide title are reused, so that e.g. the contents of one
+        slide are never returned for a slide with a different title.
+
+        Args:
+            query_engine: Query engine with the prompt templates set.
+            **kwargs: Prompt template variables.
+
+        Returns:
+            str: Scope key.
+        """
+        slide_data = kwargs.get("slide_data") or {}
+        return ResponseCache.make_key(
+            {
+                "model": Settings.llm.model,
+                "prompts": self.get_prompt_templates(query_engine),
+                "n_slides": kwargs.get("n_slides"),
+                "title": slide_data.get("title"),
+            }
+        )
+
+    @staticmethod
+    def get_prompt_text(question: str, nodes: list, **kwargs) -> str:
+        """Returns the text of a query that is embedded for the semantic
+        cache: the retrieved context, template variables and question."""
+        context = "\n\n".join(node.get_content() for node in nodes)
+        return f"{context}\n\n{json.dumps(kwargs)}\n\n{question}"
+
+    def semantic_cache_get(self, prompt_text: str, scope: str) -> tuple:
+        """Looks up a response to a similar query in the semantic cache.
+
+        Args:
+            prompt_text (str): Text of the query.
+            scope (str): Scope of the query.
+
+        Returns:
+            tuple: Embedding of the query, and the cached response or None on
+              a miss. The embedding is None if the query could not be
+              embedded.
+        """
+        try:
+            embedding = Settings.embed_model.get_text_embedding(prompt_text)
+            result = self.prompt_cache.query(
+                query_embeddings=[embedding],
+                n_results=1,
+                where={"scope": scope},
+            )
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed.\n{e}")
+            return None, None
+        if (
+            result["ids"][0]
+            and result["distances"][0][0] < SEMANTIC_CACHE_THRESHOLD
+        ):
+            logger.debug("Response read from semantic cache.")
+            return embedding, result["documents"][0][0]
+        return embedding, None
+
+    def semantic_cache_set(
+        self, embedding: list, response: str, scope: str
+    ) -> None:
+        """Stores a response in the semantic cache."""
+        if embedding is None:
+            return
+        self.prompt_cache.add(
+            ids=[str(uuid.uuid4())],
+            embeddings=[embedding],
+            documents=[response],
+            metadatas=[{"scope": scope}],
+        )
+
+    def query(self, query_engine, question: str, **kwargs) -> str:
+        """Queries the index, using the on-disk response cache.
+
+        On a miss in the exact-match cache, the response to a similar query is
+        looked up in the semantic cache before the LLM is called.
+
+        Args:
+            query_engine: Query engine with the prompt templates set.
+            question (str): Query.
+            **kwargs: Prompt template variables, used for the cache key.
+
+        Returns:
+            str: Response.
+        """
+        if not chatgpt.cache_enabled:
+            return str(query_engine.query(question))
+
+        cache = chatgpt.get_response_cache()
+        key = self.get_cache_key(query_engine, question, **kwargs)
+        response = None if chatgpt.cache_refresh else cache.get(key)
+        if response:
+            logger.debug("Response read from cache.")
+            return response
+
+        query_bundle = QueryBundle(question)
+        nodes = query_engine.retrieve(query_bundle)
+        scope = self.get_semantic_cache_scope(query_engine, **kwargs)
+        embedding, response = self.semantic_cache_get(
+            self.get_prompt_text(question, nodes, **kwargs), scope
+        )
+        if not response or chatgpt.cache_refresh:
+            response = str(query_engine.synthesize(query_bundle, nodes))
+            self.semantic_cache_set(embedding, response, scope)
+        cache.set(key, response)
+        return response
+
+    async def aquery(self, query_engine, question: str, **kwargs) -> str:
+        """Asynchronous version of `query`."""
+        if not chatgpt.cache_enabled:
+            return await read_response(await query_engine.aquery(question))
+
+        cache = chatgpt.get_response_cache()
+        key = self.get_cache_key(query_engine, question, **kwargs)
+        response = (
+            None
+            if chatgpt.cache_refresh
+            else await asyncio.to_thread(cache.get, key)
+        )
+        if response:
+            logger.debug("Response read from cache.")
+            return response
+
+        query_bundle = QueryBundle(question)
+        nodes = await query_engine.aretrieve(query_bundle)
+        scope = self.get_semantic_cache_scope(query_engine, **kwargs)
+        embedding, response = await asyncio.to_thread(
+            self.semantic_cache_get,
+            self.get_prompt_text(question, nodes, **kwargs),
+            scope,
+        )
+        if not response or chatgpt.cache_refresh:
+            response = await read_response(
+                await query_engine.asynthesize(query_bundle, nodes)
+            )
+            await asyncio.to_thread(
+                self.semantic_cache_set, embedding, response, scope
+            )
+        await asyncio.to_thread(cache.set, key, response)
+        return response
+
+    def get_query_engine(self, **kwargs):
+        """Creates a query engine over the report index.
+
+        Prompt templates are passed to the engine when it is created, instead
+        of being swapped in and out of a shared engine around each query.
+
+        Args:
+            **kwargs: Query engine arguments, e.g. prompt templates.
+
+        Returns:
+            Query engine.
+        """
+        if not self.index:
+            self.index = self.get_vector_store_index()
+        return self.index.as_query_engine(response_mode="compact", **kwargs)
+
     def get_vector_store_index(self):
-        return VectorStoreIndex.from_vector_store()
+        return VectorStoreIndex.from_vector_store(self.vector_store)
+
+    @staticmethod
+    def get_section_text(section: dict) -> str:
+        """Joins the title and content of a section and its subsections."""
+        parts = [str(section["section"]), section["content"]]
+        for subsection in section["subsections"]:
+            parts.append(str(subsection["section"]))
+            parts.append(subsection["content"])
+        return "\n".join(parts)
 
     def generate_embeddings(self):
+        if self.chroma_collection.count() > 0:
+            logger.debug("Embeddings found, skipping generation.")
+            self.index = self.get_vector_store_index()
+            self.query_engine = self.index.as_query_engine(
+                response_mode="compact"
+            )
+            return
+        metadata = {
+            "filename": str(self.report.filepath),
+            "title": str(self.report.title),
+            "authors": str(self.report.authors),
+            "citations": str(self.report.citations),
+            "id_": str(self.report.filepath),
+        }
+        # One document per section, so that sections are chunked and
+        # embedded separately
         documents = [
             Document(
-                text=str(self.report.sections),
-                metadata={
-                    "filename": str(self.report.filepath),
-                    "title": str(self.report.title),
-                    "authors": str(self.report.authors),
-                    "citations": str(self.report.citations),
-                    "id_": str(self.report.filepath),
-                },
+                text=self.get_section_text(section),
+                metadata={**metadata, "section": str(section["section"])},
             )
+            for section in self.report.sections
         ]
+        if not documents:
+            logger.warning("No sections found, embedding the full report.")
+            documents = [Document(text=str(self.report.soup), metadata=metadata)]
         self.index = VectorStoreIndex.from_documents(
             documents=documents,
             storage_context=self.storage_context,
@@ -212,32 +555,22 @@ class RAG:
         prompt_tmpl = PromptTemplate(qa_prompt_tmpl_str)
         partial_prompt_tmpl = prompt_tmpl.partial_format(n_slides=n_slides)
 
-        # Save the current prompt
-        tmp_prompt_tmpl = self.query_engine.get_prompts()
-        # Update query prompt
-        self.query_engine.update_prompts(
-            {"response_synthesizer:text_qa_template": partial_prompt_tmpl}
+        query_engine = self.get_query_engine(
+            text_qa_template=partial_prompt_tmpl
         )
-
         try:
-            response = self.query_engine.query("Generate presentation.")
+            response = self.query(
+                query_engine, "Generate presentation.", n_slides=n_slides
+            )
         except Exception as e:
             logger.error(f"Failed to generate presentation.\n{e}")
 
-        # Restore prompt
-        self.query_engine.update_prompts(tmp_prompt_tmpl)
-
         presentation = self.extract_and_validate_json(response)
         if presentation:
             try:
-                presentation_json = json.loads(presentation)
-                logger.debug(f"Parsed slide content: {presentation_json}")
-                self.presentation = presentation_json.get("presentation")
+                logger.debug(f"Parsed slide content: {presentation}")
+                self.presentation = presentation.get("presentation")
                 return self.presentation
-            except json.JSONDecodeError as e:
-                logger.error(
-                    f"Failed to parse response as JSON.\n{presentation}\n\n{e}"
-                )
             except Exception as e:
                 logger.error(
                     f"Unexpected error during JSON parsing.\n{presentation}\n\n{e}"
@@ -280,25 +613,20 @@ class RAG:
         prompt_tmpl = PromptTemplate(qa_prompt_tmpl_str)
         partial_prompt_tmpl = prompt_tmpl.partial_format(n_slides=n_slides)
 
-        # Save the current prompt
-        tmp_prompt_tmpl = self.query_engine.get_prompts()
-        # Update query prompt
-        self.query_engine.update_prompts(
-            {"response_synthesizer:text_qa_template": partial_prompt_tmpl}
+        query_engine = self.get_query_engine(
+            text_qa_template=partial_prompt_tmpl
         )
-
         try:
-            response = self.query_engine.query("Generate presentation outline.")
+            response = self.query(
+                query_engine,
+                "Generate presentation outline.",
+                n_slides=n_slides,
+            )
         except Exception as e:
             logger.error(f"Failed to generate presentation outline.\n{e}")
 
-        # Restore the prompt
-        self.query_engine.update_prompts(tmp_prompt_tmpl)
-
         try:
-            outline = re.search(
-                r"```json(.*?)```", response.__str__(), re.DOTALL
-            ).group(1)
+            outline = extract_json_block(str(response))
             outline = json.loads(outline.strip())
             self.outline = outline.get("outline")
             return self.outline
@@ -306,14 +634,18 @@ class RAG:
             logger.error(f"Failed to read response.\n{e}")
         return
 
-    def generate_slide_contents(self, slide_data: dict) -> str:
-        """Based on the slide title and keywords, generate slide contents.
+    def get_slide_contents_query_engine(self, slide_data: dict):
+        """Creates a query engine with the prompts for generating the contents
+        of a slide.
+
+        Each slide gets its own query engine, so several slides can be
+        generated concurrently without sharing prompt state.
 
         Args:
             slide_data (dict): Slide title and keywords.
 
         Returns:
-            str: Slide contents in LaTeX Beamer format.
+            Query engine for the slide.
         """
 
         # Custom query prompt template
@@ -377,80 +709,146 @@ class RAG:
         partial_prompt_tmpl = prompt_tmpl.partial_format(slide_data=slide_data)
         refine_prompt_tmpl = PromptTemplate(refine_prompt_tmpl_str)
 
-        if not self.query_engine:
-            self.query_engine = self.get_vector_store_index().as_query_engine(
-                response_mode="compact"
-            )
-
-        # Save the current prompt
-        tmp_prompt_tmpl = self.query_engine.get_prompts()
-
-        # Update query prompt
-        self.query_engine.update_prompts(
-            {
-                "response_synthesizer:text_qa_template": partial_prompt_tmpl,
-                "response_synthesizer:refine_template": refine_prompt_tmpl,
-            }
+        return self.get_query_engine(
+            text_qa_template=partial_prompt_tmpl,
+            refine_template=refine_prompt_tmpl,
+            streaming=True,
         )
 
-        try:
-            response = self.query_engine.query("Generate slide contents.")
-            logger.debug(f"Full response: {response}")
-        except Exception as e:
-            logger.error(f"Failed to generate slide contents.\n{e}")
-            return
+    def parse_slide_contents(self, response) -> str:
+        """Extracts the slide contents from a query response.
 
-        # Restore prompt
-        self.query_engine.update_prompts(tmp_prompt_tmpl)
+        Args:
+            response: Query engine response.
 
+        Returns:
+            str: Slide contents in LaTeX Beamer format.
+        """
         slide_content = self.extract_and_validate_json(response)
         if slide_content:
             try:
-                slide_content_json = json.loads(slide_content)
-                logger.debug(f"Parsed slide content: {slide_content_json}")
-                return slide_content_json.get("slide_content")
-            except json.JSONDecodeError as e:
-                logger.error(
-                    f"Failed to parse response as JSON.\n{slide_content}\n\n{e}"
-                )
+                logger.debug(f"Parsed slide content: {slide_content}")
+                return slide_content.get("slide_content")
             except Exception as e:
                 logger.error(
                     f"Unexpected error during JSON parsing.\n{slide_content}\n\n{e}"
                 )
         return
 
-    def generate_presentation_two_step(self, n_slides: int = 7):
+    def generate_slide_contents(self, slide_data: dict) -> str:
+        """Based on the slide title and keywords, generate slide contents.
+
+        Args:
+            slide_data (dict): Slide title and keywords.
+
+        Returns:
+            str: Slide contents in LaTeX Beamer format.
+        """
+        query_engine = self.get_slide_contents_query_engine(slide_data)
+        try:
+            response = self.query(
+                query_engine, "Generate slide contents.", slide_data=slide_data
+            )
+            logger.debug(f"Full response: {response}")
+        except Exception as e:
+            logger.error(f"Failed to generate slide contents.\n{e}")
+            return
+        return self.parse_slide_contents(response)
+
+    async def agenerate_slide_contents(
+        self, slide_data: dict, sem: asyncio.Semaphore = None
+    ) -> str:
+        """Asynchronous version of `generate_slide_contents`.
+
+        Args:
+            slide_data (dict): Slide title and keywords.
+            sem (asyncio.Semaphore, optional): Semaphore limiting the number
+              of concurrent queries.
+
+        Returns:
+            str: Slide contents in LaTeX Beamer format.
+        """
+        query_engine = self.get_slide_contents_query_engine(slide_data)
+        try:
+            if sem:
+                async with sem:
+                    response = await self.aquery(
+                        query_engine,
+                        "Generate slide contents.",
+                        slide_data=slide_data,
+                    )
+            else:
+                response = await self.aquery(
+                    query_engine,
+                    "Generate slide contents.",
+                    slide_data=slide_data,
+                )
+            logger.debug(f"Full response: {response}")
+        except Exception as e:
+            logger.error(f"Failed to generate slide contents.\n{e}")
+            return
+        return self.parse_slide_contents(response)
+
+    async def agenerate_all_slide_contents(
+        self, max_concurrency: int = 8
+    ) -> list:
+        """Generates the contents of all slides in the outline concurrently.
+
+        Args:
+            max_concurrency (int, optional): Maximum number of concurrent
+              queries. Defaults to 8.
+
+        Returns:
+            list: Slide contents, in the order of the outline.
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+        return await asyncio.gather(
+            *[
+                self.agenerate_slide_contents(slide_data, sem)
+                for slide_data in self.outline
+            ]
+        )
+
+    def generate_presentation_two_step(
+        self, n_slides: int = 7, max_concurrency: int = 8
+    ):
         self.generate_presentation_outline(n_slides)
         slides = []
         len_outline = len(self.outline)
-        for i, slide_data in enumerate(self.outline):
-            content = self.generate_slide_contents(slide_data)
+        contents = utils.run_coroutine(
+            self.agenerate_all_slide_contents(max_concurrency)
+        )
+        for i, content in enumerate(contents):
+            if not content:
+                logger.warning(f"No contents generated for slide {i}.")
+                continue
             # Clean up tags in wrong places
             if i == 0:
                 # Remove \end{document} from the first slide
-                content = re.sub(r"\\end{document}", "", content)
+                content = content.replace("\\end{document}", "")
             elif i == len_outline - 1:
                 # Remove \documentclass and \begin{document} from the last slide
-                content = re.sub(r"\\documentclass.*\n", "", content)
-                content = re.sub(r"\\begin{document}", "", content)
+                content = DOCUMENTCLASS_RE.sub("", content)
+                content = content.replace("\\begin{document}", "")
             else:
                 # Remove lines with \documentclass, \begin{document}, \end{document}
                 # from all other slides.
-                content = re.sub(r"\\documentclass.*\n", "", content)
-                content = re.sub(r"\\begin{document}", "", content)
-                content = re.sub(r"\\end{document}", "", content)
+                content = DOCUMENTCLASS_RE.sub("", content)
+                content = content.replace("\\begin{document}", "").replace(
+                    "\\end{document}", ""
+                )
             slides.append(content)
         self.presentation = "\n".join(slides)
         # Check that there is a \documentclass and \begin{document} command in first part of the document
-        if not re.search(r"\\documentclass", self.presentation):
+        if "\\documentclass" not in self.presentation:
             self.presentation = "\\documentclass{beamer}\n" + self.presentation
-        if not re.search(r"\\begin{document}", self.presentation):
+        if "\\begin{document}" not in self.presentation:
             self.presentation = self.presentation.replace(
                 "\\documentclass{beamer}",
                 "\\documentclass{beamer}\n\\begin{document}",
             )
         # Check that the document ends with \end{document}
-        if not re.search(r"\\end{document}", self.presentation):
+        if "\\end{document}" not in self.presentation:
             self.presentation = self.presentation + "\n\\end{document}"
         return self.presentation
 
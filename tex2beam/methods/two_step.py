@@ -1,16 +1,35 @@
+import asyncio
+import contextlib
 import json
 import logging
+import os
+import re
+import tempfile
+import tiktoken
 
+from functools import lru_cache
+
+from tex2beam import utils
 from tex2beam.classes.latex_report import LatexReport
-from tex2beam.methods.chatgpt import chatgpt_completion
+from tex2beam.methods.chatgpt import (
+    MODEL,
+    chatgpt_batch_completion,
+    chatgpt_completion,
+    chatgpt_completion_async,
+    chatgpt_completion_stream,
+)
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of tokens of report context sent with each slide
+MAX_CONTEXT_TOKENS = 2000
+# Start of the array of sections in an outline
+PRESENTATION_ARRAY_RE = re.compile(r'"presentation"\s*:\s*\[')
 
-def generate_presentation_outline(
-    report: LatexReport, api_key: str, n_slides: int
-) -> dict:
-    system_message = """
+# The system messages are static, so that the request prefixes are identical
+# and can be served from the OpenAI prompt cache. Request specific content is
+# placed at the end of the user messages.
+OUTLINE_SYSTEM_MESSAGE = """
     Your task is to generate a presentation outline based on the table of contents of a research paper. Here are the requirements:
 
     1. **Input and Format:**
@@ -20,7 +39,7 @@ def generate_presentation_outline(
     2. **Presentation Structure:**
     - The presentation should be suitable for a LaTeX Beamer format.
     - The presentation should include title, introduction, and conclusion slides.
-    - Target length: %s slides, including the title, introduction, and conclusion slides.
+    - Target length: the number of slides given after the table of contents, including the title, introduction, and conclusion slides.
     - If there is insufficient content in the report, create a shorter presentation.
 
     3. **Slide Content:**
@@ -69,19 +88,7 @@ def generate_presentation_outline(
     ```
     """
 
-    response = chatgpt_completion(
-        system_message=system_message % str(n_slides),
-        user_message=json.dumps(report.toc),
-        api_key=api_key,
-    )
-
-    return response
-
-
-def generate_slide_contents(
-    outline: dict, report: LatexReport, api_key: str
-) -> dict:
-    system_message = """
+SLIDE_CONTENTS_SYSTEM_MESSAGE = """
     Your task is to generate detailed slide content for a LaTeX Beamer presentation based on a provided slide outline and the context from the corresponding section of the research paper. Here are the requirements:
 
     1. **Input:**
@@ -109,24 +116,7 @@ def generate_slide_contents(
     - Before returning the slide content, critique the content according to the requirements above and make any corrections required.
     """
 
-    for slide in outline["presentation"]:
-        for s in slide["slides"]:
-            if s["title"] == "Title Slide":
-                s["title"] = report.title
-                context = f"Title: {report.title}, Authors: {str(report.authors)}, Affiliations: {str(report.affiliations)}"
-            else:
-                context = report.get_section(s["report_section"])
-            response = chatgpt_completion(
-                system_message=system_message,
-                user_message=f"Slide: {json.dumps(s)}, Context: {json.dumps(context)}",
-                api_key=api_key,
-            )
-            s["content"] = response["content"]
-    return outline
-
-
-def generate_beamer_presentation(contents: dict, api_key: str) -> dict:
-    system_message = """
+BEAMER_SYSTEM_MESSAGE = """
     Your task is to generate LaTeX Beamer code for a presentation based on the provided JSON input. Here are the requirements:
 
     1. **Input:**
@@ -152,8 +142,329 @@ def generate_beamer_presentation(contents: dict, api_key: str) -> dict:
     - Before returning the LaTeX Beamer code, critique the content according to the requirements above and make any corrections required.
     """
 
+
+def generate_presentation_outline(
+    report: LatexReport, api_key: str, n_slides: int
+) -> dict:
+    response = chatgpt_completion(
+        system_message=OUTLINE_SYSTEM_MESSAGE,
+        user_message=(
+            f"{json.dumps(report.toc)}\n\n"
+            f"Target length: {n_slides} slides."
+        ),
+        api_key=api_key,
+    )
+
+    return response
+
+
+async def generate_presentation_outline_async(
+    report: LatexReport,
+    api_key: str,
+    n_slides: int,
+    sem: asyncio.Semaphore = None,
+) -> dict:
+    """Asynchronous version of `generate_presentation_outline`."""
+    async with sem or contextlib.nullcontext():
+        return await chatgpt_completion_async(
+            system_message=OUTLINE_SYSTEM_MESSAGE,
+            user_message=(
+                f"{json.dumps(report.toc)}\n\n"
+                f"Target length: {n_slides} slides."
+            ),
+            api_key=api_key,
+        )
+
+
+async def iter_outline_sections(chunks):
+    """Parses the sections of a streamed presentation outline.
+
+    Args:
+        chunks: Asynchronous iterator over the parts of the outline JSON.
+
+    Yields:
+        Each section of the outline, as soon as it is complete.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    # Position after the last parsed section
+    pos = None
+    async for chunk in chunks:
+        buffer += chunk
+        if pos is None:
+            match = PRESENTATION_ARRAY_RE.search(buffer)
+            if not match:
+                continue
+            pos = match.end()
+        elif "}" not in chunk:
+            # No section can have been completed
+            continue
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer) or buffer[pos] != "{":
+                break
+            try:
+                section, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The section is not complete yet
+                break
+            yield section
+
+
+@lru_cache(maxsize=None)
+def get_encoding() -> tiktoken.Encoding:
+    """Returns the tokenizer of the model, loaded on first use."""
+    return tiktoken.encoding_for_model(MODEL)
+
+
+def truncate_tokens(text: str, max_tokens: int = MAX_CONTEXT_TOKENS) -> str:
+    """Truncates text to at most max_tokens tokens.
+
+    Args:
+        text: Text to truncate.
+        max_tokens: Maximum number of tokens.
+
+    Returns:
+        Truncated text.
+    """
+    if len(text) <= max_tokens:
+        # A token is at least one character, so short text always fits
+        return text
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    logger.debug(f"Truncating context from {len(tokens)} tokens.")
+    return encoding.decode(tokens[:max_tokens])
+
+
+def get_slide_message(
+    s: dict, report: LatexReport, contexts: dict = None
+) -> str:
+    """Builds the user message for generating the contents of a slide.
+
+    The title slide gets the title of the report.
+
+    Args:
+        s: Slide in the outline.
+        report: Report.
+        contexts: Serialized contexts by report section, shared by the slides
+          of a presentation so that each section is looked up once. Section
+          contexts are truncated to `MAX_CONTEXT_TOKENS` tokens of the
+          serialized section.
+
+    Returns:
+        User message with the slide and its context.
+    """
+    if contexts is None:
+        contexts = {}
+    if s["title"] == "Title Slide":
+        s["title"] = report.title
+        # The title slide context is stored under None
+        key = None
+        if key not in contexts:
+            contexts[key] = json.dumps(
+                f"Title: {report.title}, Authors: {str(report.authors)}, "
+                f"Affiliations: {str(report.affiliations)}"
+            )
+    else:
+        key = s["report_section"]
+        if key not in contexts:
+            # The section is a dictionary with the text of its subsections,
+            # so the serialized section is truncated
+            contexts[key] = truncate_tokens(
+                json.dumps(report.get_section(key))
+            )
+    # The context comes first, so that requests for slides on the same
+    # section share a prefix
+    return f"Context: {contexts[key]}, Slide: {json.dumps(s)}"
+
+
+def generate_slide_contents(
+    outline: dict, report: LatexReport, api_key: str
+) -> dict:
+    return utils.run_coroutine(
+        generate_slide_contents_async(outline, report, api_key)
+    )
+
+
+async def generate_slide_content_async(
+    s: dict,
+    report: LatexReport,
+    api_key: str,
+    sem: asyncio.Semaphore,
+    contexts: dict = None,
+) -> dict:
+    """Generates the contents of a single slide.
+
+    Args:
+        s: Slide in the outline.
+        report: Report.
+        api_key: OpenAI API key.
+        sem: Semaphore limiting the number of concurrent requests.
+        contexts: Serialized contexts by report section.
+
+    Returns:
+        Parsed completion with the slide contents.
+    """
+    user_message = get_slide_message(s, report, contexts)
+    async with sem:
+        return await chatgpt_completion_async(
+            system_message=SLIDE_CONTENTS_SYSTEM_MESSAGE,
+            user_message=user_message,
+            api_key=api_key,
+        )
+
+
+def set_slide_contents(slides: list, responses: list) -> None:
+    """Fills in the slide contents, skipping slides that failed."""
+    for s, response in zip(slides, responses):
+        if isinstance(response, Exception):
+            logger.error(f"Failed to generate slide {s['title']}: {response}")
+            continue
+        s["content"] = response["content"]
+
+
+async def generate_slide_contents_async(
+    outline: dict,
+    report: LatexReport,
+    api_key: str,
+    max_concurrent: int = 8,
+    sem: asyncio.Semaphore = None,
+) -> dict:
+    """Generates the contents of all slides in the outline concurrently.
+
+    Args:
+        outline: Presentation outline.
+        report: Report.
+        api_key: OpenAI API key.
+        max_concurrent: Maximum number of concurrent requests.
+        sem: Semaphore limiting the number of concurrent requests, shared
+          with other presentations. Overrides `max_concurrent`.
+
+    Returns:
+        Outline with the slide contents filled in.
+    """
+    if sem is None:
+        sem = asyncio.Semaphore(max_concurrent)
+    contexts = {}
+    slides = [s for slide in outline["presentation"] for s in slide["slides"]]
+    responses = await asyncio.gather(
+        *[
+            generate_slide_content_async(s, report, api_key, sem, contexts)
+            for s in slides
+        ],
+        return_exceptions=True,
+    )
+    set_slide_contents(slides, responses)
+    return outline
+
+
+async def generate_outline_and_slide_contents_async(
+    report: LatexReport,
+    api_key: str,
+    n_slides: int,
+    sem: asyncio.Semaphore = None,
+) -> dict:
+    """Generates the presentation outline and the contents of its slides.
+
+    The outline is streamed, and the contents of the slides in a section
+    are requested as soon as the section is complete, while the rest of the
+    outline is still being generated.
+
+    Args:
+        report: Report.
+        api_key: OpenAI API key.
+        n_slides: Number of slides.
+        sem: Semaphore limiting the number of concurrent requests, shared
+          with other presentations.
+
+    Returns:
+        Outline with the slide contents filled in.
+    """
+    if sem is None:
+        sem = asyncio.Semaphore(8)
+    contexts = {}
+    sections = []
+    slides = []
+    tasks = []
+    try:
+        async with sem:
+            chunks = chatgpt_completion_stream(
+                system_message=OUTLINE_SYSTEM_MESSAGE,
+                user_message=(
+                    f"{json.dumps(report.toc)}\n\n"
+                    f"Target length: {n_slides} slides."
+                ),
+                api_key=api_key,
+            )
+            async for section in iter_outline_sections(chunks):
+                sections.append(section)
+                for s in section.get("slides", []):
+                    slides.append(s)
+                    tasks.append(
+                        asyncio.create_task(
+                            generate_slide_content_async(
+                                s, report, api_key, sem, contexts
+                            )
+                        )
+                    )
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+    if not sections:
+        logger.error("No sections found in the presentation outline.")
+    responses = await asyncio.gather(*tasks, return_exceptions=True)
+    set_slide_contents(slides, responses)
+    return {"presentation": sections}
+
+
+def generate_slide_contents_batch(
+    outline: dict, report: LatexReport, api_key: str
+) -> dict:
+    """Generates the contents of all slides in the outline with the OpenAI
+    Batch API.
+
+    Args:
+        outline: Presentation outline.
+        report: Report.
+        api_key: OpenAI API key.
+
+    Returns:
+        Outline with the slide contents filled in.
+    """
+    slides = {}
+    messages = {}
+    contexts = {}
+    for i, slide in enumerate(outline["presentation"]):
+        for j, s in enumerate(slide["slides"]):
+            custom_id = f"{i}:{j}"
+            slides[custom_id] = s
+            messages[custom_id] = (
+                SLIDE_CONTENTS_SYSTEM_MESSAGE,
+                get_slide_message(s, report, contexts),
+            )
+    with tempfile.TemporaryDirectory() as batch_folder:
+        responses = chatgpt_batch_completion(
+            api_key=api_key,
+            messages=messages,
+            batch_input=os.path.join(batch_folder, "batch_input.jsonl"),
+        )
+    for custom_id, s in slides.items():
+        response = responses.get(custom_id)
+        if not response:
+            logger.error(f"Failed to generate slide {s['title']}.")
+            continue
+        s["content"] = response["content"]
+    return outline
+
+
+def generate_beamer_presentation(contents: dict, api_key: str) -> dict:
+
     presentation = chatgpt_completion(
-        system_message=system_message,
+        system_message=BEAMER_SYSTEM_MESSAGE,
         user_message=json.dumps(contents),
         api_key=api_key,
     )
@@ -161,15 +472,123 @@ def generate_beamer_presentation(contents: dict, api_key: str) -> dict:
     return presentation
 
 
-def two_step_generation(latex_path: str, api_key: str, n_slides: int = 5):
+async def generate_beamer_presentation_async(
+    contents: dict, api_key: str, sem: asyncio.Semaphore = None
+) -> dict:
+    """Asynchronous version of `generate_beamer_presentation`."""
+    async with sem or contextlib.nullcontext():
+        return await chatgpt_completion_async(
+            system_message=BEAMER_SYSTEM_MESSAGE,
+            user_message=json.dumps(contents),
+            api_key=api_key,
+        )
+
+
+def two_step_generation(
+    latex_path: str, api_key: str, n_slides: int = 5, batch: bool = False
+):
     logger.info("Generating presentation for report: {latex_path}")
     report = LatexReport(latex_path)
-    outline = generate_presentation_outline(report, api_key, n_slides)
-    contents = generate_slide_contents(outline, report, api_key)
+    if batch:
+        outline = generate_presentation_outline(report, api_key, n_slides)
+        contents = generate_slide_contents_batch(outline, report, api_key)
+    else:
+        contents = utils.run_coroutine(
+            generate_outline_and_slide_contents_async(
+                report, api_key, n_slides
+            )
+        )
     presentation = generate_beamer_presentation(contents, api_key)
     if presentation and len(presentation.get("presentation")) > 0:
         return presentation
     else:
         logger.error(
-            "Generated presentation is empty. Please check the input report and try again."
+            "Generated presentation is empty. Please check the input report "
+            "and try again."
+        )
+
+
+async def two_step_generation_async(
+    latex_path: str,
+    api_key: str,
+    n_slides: int = 5,
+    sem: asyncio.Semaphore = None,
+):
+    """Asynchronous version of `two_step_generation`.
+
+    The slide contents are requested while the outline is still streaming,
+    and while one presentation waits for a response, the stages of other
+    presentations can run.
+
+    Args:
+        latex_path: Path to the report.
+        api_key: OpenAI API key.
+        n_slides: Number of slides.
+        sem: Semaphore limiting the number of concurrent requests, shared
+          by all presentations.
+
+    Returns:
+        Beamer presentation.
+    """
+    if sem is None:
+        sem = asyncio.Semaphore(8)
+    logger.info(f"Generating presentation for report: {latex_path}")
+    report = await asyncio.to_thread(LatexReport, latex_path)
+    contents = await generate_outline_and_slide_contents_async(
+        report, api_key, n_slides, sem
+    )
+    presentation = await generate_beamer_presentation_async(
+        contents, api_key, sem
+    )
+    if presentation and len(presentation.get("presentation")) > 0:
+        return presentation
+    else:
+        logger.error(
+            "Generated presentation is empty. Please check the input report "
+            "and try again."
+        )
+
+
+def two_step_generation_batch(
+    latex_paths: list,
+    api_key: str,
+    n_slides: int = 5,
+    max_concurrent: int = 16,
+) -> list:
+    """Generates presentations for several reports with the Two-Step method.
+
+    The presentations are generated concurrently, so that the stages of
+    different presentations overlap.
+
+    Args:
+        latex_paths: Paths to the reports.
+        api_key: OpenAI API key.
+        n_slides: Number of slides.
+        max_concurrent: Maximum number of concurrent requests in total.
+
+    Returns:
+        Beamer presentations, in the order of the reports. Failed
+        presentations are None.
+    """
+
+    async def generate_all():
+        sem = asyncio.Semaphore(max_concurrent)
+        return await asyncio.gather(
+            *[
+                two_step_generation_async(latex_path, api_key, n_slides, sem)
+                for latex_path in latex_paths
+            ],
+            return_exceptions=True,
         )
+
+    presentations = utils.run_coroutine(generate_all())
+    for latex_path, presentation in zip(latex_paths, presentations):
+        if isinstance(presentation, Exception):
+            logger.error(
+                f"Error generating presentation for {latex_path}: "
+                f"{presentation}"
+            )
+    return [
+        None if isinstance(presentation, Exception) else presentation
+        for presentation in presentations
+    ]
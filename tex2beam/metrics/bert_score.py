@@ -1,10 +1,107 @@
+import contextlib
 import logging
+import numpy as np
 import torch
-from evaluate import load
+
+from bert_score import BERTScorer
+from functools import lru_cache
+from transformers import AutoModel, BitsAndBytesConfig
+
+from tex2beam.metrics.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
-bertscore = load("bertscore")
+HALF_PRECISIONS = {"bf16": torch.bfloat16, "fp16": torch.float16}
+# use cuda if available
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# Default model precision on CUDA
+PRECISION = "bf16"
+# Faster model with less than half the parameters of the default model, which
+# ranks close to it in the correlation table of the bert-score README
+FAST_MODEL_TYPE = "microsoft/deberta-large-mnli"
+
+
+def load_int8_model(model_type: str, num_layers: int) -> AutoModel:
+    """Loads a model with 8-bit weights for BERTScore.
+
+    Requires CUDA and the bitsandbytes package.
+
+    Args:
+        model_type: Name of the model.
+        num_layers: Number of layers to keep, like bert-score does.
+
+    Returns:
+        Quantized model.
+    """
+    model = AutoModel.from_pretrained(
+        model_type,
+        quantization_config=BitsAndBytesConfig(load_in_8bit=True),
+    )
+    model.encoder.layer = torch.nn.ModuleList(
+        model.encoder.layer[:num_layers]
+    )
+    model.eval()
+    return model
+
+
+@lru_cache(maxsize=4)
+def get_scorer(
+    model_type: str,
+    lang: str,
+    device: str,
+    batch_size: int = 64,
+    nthreads: int = 4,
+    precision: str = "bf16",
+    quantization: str = None,
+) -> BERTScorer:
+    """Returns a shared BERTScorer, so the model is only loaded once.
+
+    Args:
+        model_type: Name of the model used to compute the embeddings.
+        lang: Language of the sentences.
+        device: Device to run the model on.
+        batch_size: Default number of sentence pairs per encoder batch.
+        nthreads: Number of threads used for tokenization.
+        precision: Model precision on CUDA, "bf16", "fp16" or "fp32". The
+          model always runs in full precision on CPU.
+        quantization: Set to "int8" to run the model with 8-bit weights on
+          CUDA. Overrides precision.
+
+    Returns:
+        BERTScorer.
+    """
+    if quantization not in (None, "int8"):
+        raise ValueError(f"Invalid quantization: {quantization}.")
+    logger.debug(f"Loading BERTScore model {model_type} on {device}.")
+    scorer = BERTScorer(
+        model_type=model_type,
+        lang=lang,
+        device=device,
+        batch_size=batch_size,
+        nthreads=nthreads,
+    )
+    if quantization and not device.startswith("cuda"):
+        logger.warning("int8 quantization requires CUDA, ignoring it.")
+    elif quantization:
+        scorer._model = load_int8_model(model_type, scorer.num_layers)
+        torch.cuda.empty_cache()
+        return scorer
+    if device.startswith("cuda"):
+        if precision == "bf16" and not torch.cuda.is_bf16_supported():
+            logger.debug("bf16 is not supported, falling back to fp16.")
+            precision = "fp16"
+        if precision in HALF_PRECISIONS:
+            scorer._model = scorer._model.to(dtype=HALF_PRECISIONS[precision])
+        else:
+            # TF32 tensor cores are a cheaper alternative to half precision
+            torch.backends.cuda.matmul.allow_tf32 = True
+    return scorer
+
+
+@lru_cache(maxsize=4)
+def get_embedding_cache(model_key: str) -> EmbeddingCache:
+    """Returns the shared on-disk embedding cache of a model."""
+    return EmbeddingCache(model_key)
 
 
 def calculate_bert_score(
@@ -14,17 +111,121 @@ def calculate_bert_score(
     # model_type: str = "roberta-large"  # default model
     # Recommended model from https://pypi.org/project/bert-score:
     model_type: str = "microsoft/deberta-xlarge-mnli",
+    batch_size: int = 64,
+    nthreads: int = 4,
+    precision: str = None,
+    quantization: str = None,
+    cache_embeddings: bool = True,
 ) -> dict:
-    # use cuda if available
-    if torch.cuda.is_available():
-        device = "cuda"
-    else:
-        device = "cpu"
-    logger.debug(f"Using device: {device}")
-    return bertscore.compute(
-        predictions=predictions,
-        references=references,
-        lang=lang,
-        model_type=model_type,
-        device=device,
+    """Calculates BERTScore for each prediction and reference pair.
+
+    Pass all pairs in one call, so they are encoded in full batches.
+
+    Args:
+        predictions: List of predictions.
+        references: List of references.
+        lang: Language of the sentences.
+        model_type: Name of the model used to compute the embeddings.
+        batch_size: Number of sentence pairs per encoder batch. Halved until
+          the batches fit in GPU memory.
+        nthreads: Number of threads used for tokenization.
+        precision: Model precision on CUDA, "bf16", "fp16" or "fp32".
+          Defaults to `PRECISION`.
+        quantization: Set to "int8" to run the model with 8-bit weights on
+          CUDA. Use with `FAST_MODEL_TYPE` for the fastest scoring.
+        cache_embeddings: Cache the embeddings of the sentences on disk, so
+          that sentences scored before are not encoded again.
+
+    Returns:
+        Dictionary with lists of precision, recall and F1 scores.
+    """
+    scorer = get_scorer(
+        model_type,
+        lang,
+        DEVICE,
+        nthreads=nthreads,
+        precision=precision or PRECISION,
+        quantization=quantization,
+    )
+    predictions, references = list(predictions), list(references)
+    # Score the pairs sorted by length, so that each batch of the greedy
+    # matching is padded to similar lengths
+    order = np.argsort(
+        [len(pred) + len(ref) for pred, ref in zip(predictions, references)],
+        kind="stable",
+    )
+    predictions = [predictions[k] for k in order]
+    references = [references[k] for k in order]
+    if cache_embeddings:
+        dtype = next(scorer._model.parameters()).dtype
+        embedding_cache = get_embedding_cache(
+            f"{scorer.hash}_{dtype}_{quantization}"
+        )
+    while True:
+        try:
+            with (
+                embedding_cache.activate()
+                if cache_embeddings
+                else contextlib.nullcontext()
+            ), torch.inference_mode():
+                p, r, f1 = scorer.score(
+                    predictions, references, batch_size=batch_size
+                )
+            break
+        except torch.cuda.OutOfMemoryError:
+            if batch_size <= 1:
+                raise
+            # Retry with smaller batches
+            batch_size //= 2
+            logger.warning(
+                f"CUDA out of memory, reducing batch size to {batch_size}."
+            )
+            torch.cuda.empty_cache()
+    # Restore the input order
+    scores = {}
+    for key, values in (("precision", p), ("recall", r), ("f1", f1)):
+        scores[key] = np.empty(len(order))
+        scores[key][order] = values.float().cpu().numpy()
+        scores[key] = scores[key].tolist()
+    return scores
+
+
+def calculate_bert_score_matrix(
+    candidates: list, references: list, **kwargs
+) -> dict:
+    """Calculates BERTScore for every candidate and reference pair.
+
+    bert-score embeds each unique sentence once, so scoring C unique
+    candidates against R unique references costs C + R encodings and
+    C * R alignments. Identical pairs get a score of 1.0 without being
+    scored.
+
+    Args:
+        candidates: List of unique candidates.
+        references: List of unique references.
+        **kwargs: Additional arguments to pass to `calculate_bert_score`.
+
+    Returns:
+        Dictionary with precision, recall and F1 score matrices, with one
+        row per candidate and one column per reference.
+    """
+    shape = (len(candidates), len(references))
+    scores = {key: np.ones(shape) for key in ("precision", "recall", "f1")}
+    # Object arrays of the elements, so that the pairs can be gathered by
+    # index
+    candidates = np.fromiter(candidates, dtype=object, count=shape[0])
+    references = np.fromiter(references, dtype=object, count=shape[1])
+    rows, cols = np.meshgrid(
+        np.arange(shape[0]), np.arange(shape[1]), indexing="ij"
     )
+    rows, cols = rows.ravel(), cols.ravel()
+    # Skip the identical pairs
+    differ = candidates[rows] != references[cols]
+    rows, cols = rows[differ], cols[differ]
+    if len(rows):
+        bertscore = calculate_bert_score(
+            candidates[rows].tolist(), references[cols].tolist(), **kwargs
+        )
+        for key, matrix in scores.items():
+            matrix[rows, cols] = bertscore[key]
+    return scores
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import os
+import torch
+
+from bert_score import utils as bert_score_utils
+from contextlib import contextmanager
+from torch.nn.utils.rnn import pad_sequence
+
+logger = logging.getLogger(__name__)
+
+CACHE_FOLDER = os.path.join(
+    os.path.expanduser("~"), ".cache", "tex2beam", "embeddings"
+)
+
+
+class EmbeddingCache:
+    """On-disk cache of BERTScore token embeddings, keyed by model and text.
+
+    While active, the cache replaces the embedding function of bert-score,
+    so only sentences that have not been embedded before are encoded.
+    """
+
+    def __init__(self, model_key: str, folder: str = CACHE_FOLDER):
+        """Initializes the EmbeddingCache class.
+
+        Args:
+            model_key: Identifies the model and its settings. Embeddings of
+              different models are never shared.
+            folder: Folder of the cached embeddings.
+        """
+        self.model_key = model_key
+        self.folder = folder
+
+    def get_path(self, text: str) -> str:
+        """Returns the path of the cached embeddings of a text."""
+        key = hashlib.sha1(f"{self.model_key}\0{text}".encode()).hexdigest()
+        return os.path.join(self.folder, key[:2], f"{key}.pt")
+
+    def get(self, text: str) -> torch.Tensor:
+        """Returns the cached embeddings of a text, or None on a miss."""
+        path = self.get_path(text)
+        if not os.path.exists(path):
+            return None
+        try:
+            return torch.load(path)
+        except Exception as e:
+            logger.warning(f"Error reading cached embeddings {path}: {e}")
+            return None
+
+    def set(self, text: str, embedding: torch.Tensor) -> None:
+        """Stores the embeddings of a text."""
+        path = self.get_path(text)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(embedding.detach().cpu().clone(), tmp_path)
+        os.replace(tmp_path, path)
+
+    def get_bert_embedding(
+        self,
+        all_sens,
+        model,
+        tokenizer,
+        idf_dict,
+        batch_size=-1,
+        device="cuda:0",
+        all_layers=False,
+    ):
+        """Replacement for `bert_score.utils.get_bert_embedding` which only
+        encodes the sentences missing from the cache."""
+        padded_sens, padded_idf, lens, mask = bert_score_utils.collate_idf(
+            all_sens, tokenizer, idf_dict, device=device
+        )
+        embeddings = [self.get(sen) for sen in all_sens]
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        if missing:
+            encoded = bert_score_utils.bert_encode(
+                model, padded_sens[missing], attention_mask=mask[missing]
+            )
+            for k, i in enumerate(missing):
+                embeddings[i] = encoded[k, : int(lens[i])]
+                self.set(all_sens[i], embeddings[i])
+        total_embedding = pad_sequence(
+            [emb.to(device) for emb in embeddings], batch_first=True
+        )
+        return total_embedding, mask, padded_idf
+
+    @contextmanager
+    def activate(self):
+        """Uses the cache for the BERTScore calculations in the context."""
+        get_bert_embedding = bert_score_utils.get_bert_embedding
+
+        def cached_get_bert_embedding(*args, all_layers=False, **kwargs):
+            if all_layers:
+                return get_bert_embedding(*args, all_layers=True, **kwargs)
+            return self.get_bert_embedding(*args, **kwargs)
+
+        bert_score_utils.get_bert_embedding = cached_get_bert_embedding
+        try:
+            yield self
+        finally:
+            bert_score_utils.get_bert_embedding = get_bert_embedding
@@ -3,53 +3,113 @@ import numpy as np
 from tex2beam import utils
 
 
-def swap_random_elements(elements: list, n: int = 1, seed: int = None) -> list:
+def get_rng(
+    seed: int = None, rng: np.random.Generator = None
+) -> np.random.Generator:
+    """Returns the given generator, or a new one seeded with seed.
+
+    Pass the same generator to repeated noise calls to avoid seeding a new
+    generator for every call.
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed=seed)
+    return rng
+
+
+def copy_unique(elements: list, assume_unique: bool = False) -> list:
+    """Returns a copy of the list without duplicates.
+
+    Args:
+        elements: List to copy.
+        assume_unique: Skip removing duplicates, for lists known to be
+          unique.
+    """
+    if assume_unique:
+        return list(elements)
+    return utils.remove_duplicates(elements)
+
+
+def swap_random_elements(
+    elements: list,
+    n: int = 1,
+    seed: int = None,
+    rng: np.random.Generator = None,
+    assume_unique: bool = False,
+) -> list:
     """Swap n random elements in a list."""
-    rng = np.random.default_rng(seed=seed)
-    elements = utils.remove_duplicates(elements)
-    if len(elements) <= n:
+    elements = copy_unique(elements, assume_unique)
+    L = len(elements)
+    if n <= 0 or L <= n:
         return elements
-    for _ in range(n):
-        i, j = rng.choice(
-            range(len(elements)),
-            2,
-            replace=False,
-        )
+    rng = get_rng(seed, rng)
+    if 2 * n <= L:
+        # Draw all pairs at once, with no element swapped twice
+        idxs = rng.choice(L, size=2 * n, replace=False).reshape(n, 2)
+    else:
+        idxs = [rng.choice(L, 2, replace=False) for _ in range(n)]
+    for i, j in idxs:
         elements[i], elements[j] = elements[j], elements[i]
     return elements
 
 
 def remove_random_elements(
-    elements: list, n: int = 1, seed: int = None
+    elements: list,
+    n: int = 1,
+    seed: int = None,
+    rng: np.random.Generator = None,
+    assume_unique: bool = False,
 ) -> list:
     """Remove n random elements from a list."""
-    rng = np.random.default_rng(seed=seed)
-    elements = utils.remove_duplicates(elements)
-    if len(elements) <= n:
+    elements = copy_unique(elements, assume_unique)
+    L = len(elements)
+    if n <= 0 or L <= n:
         return elements
-    for _ in range(n):
-        i = rng.choice(range(len(elements)))
-        elements.pop(i)
-    return elements
+    rng = get_rng(seed, rng)
+    # Filter in one pass instead of popping, which shifts the list each time
+    victims = set(rng.choice(L, size=n, replace=False).tolist())
+    return [e for k, e in enumerate(elements) if k not in victims]
 
 
 def replace_random_elements(
-    elements: list, replacements: list, n: int = 1, seed: int = None
+    elements: list,
+    replacements: list,
+    n: int = 1,
+    seed: int = None,
+    rng: np.random.Generator = None,
+    assume_unique: bool = False,
 ) -> list:
     """Replace random element of a list with a random element from another
     list."""
-    rng = np.random.default_rng(seed=seed)
-    elements = utils.remove_duplicates(elements)
-    replacements = utils.remove_duplicates(replacements)
-    if len(elements) <= n:
-        n = len(elements)
-    idxs = np.arange(n)
-    rng.shuffle(idxs)
-    for i in range(n):
-        elements[idxs[i]] = replacements[rng.choice(range(len(replacements)))]
+    elements = copy_unique(elements, assume_unique)
+    n = min(n, len(elements))
+    if n <= 0:
+        return elements
+    replacements = copy_unique(replacements, assume_unique)
+    rng = get_rng(seed, rng)
+    positions = rng.choice(len(elements), size=n, replace=False)
+    picks = rng.choice(len(replacements), size=n)
+    for i, j in zip(positions.tolist(), picks.tolist()):
+        elements[i] = replacements[j]
     return elements
 
 
-def reverse_list(elements: list) -> list:
-    """Reverse list elements."""
+def reverse_list(
+    elements: list, *, inplace: bool = False, lazy: bool = False
+) -> list:
+    """Reverse list elements.
+
+    Args:
+        elements: List to reverse.
+        inplace: Reverse the list in place instead of copying it.
+        lazy: Return a reverse iterator over the list instead of a list, for
+          callers that only iterate over the result once.
+
+    Returns:
+        Reversed list, or a reverse iterator if lazy.
+    """
+    if lazy:
+        return reversed(elements)
+    if inplace:
+        elements.reverse()
+        return elements
     return elements[::-1]
@@ -1,8 +1,73 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 
+def show_or_save(fig: plt.Figure, save_path: str = None) -> None:
+    """Shows the figure, or saves it to disk and closes it.
+
+    Args:
+        fig: Figure to show or save.
+        save_path: Path of the image file. Shows the figure if not set.
+    """
+    if save_path:
+        fig.savefig(save_path, dpi=120)
+        plt.close(fig)
+    else:
+        plt.show()
+
+
+def histogram(
+    ax: plt.Axes,
+    values: pd.Series,
+    bins="auto",
+    stat: str = "count",
+    cumulative: bool = False,
+) -> None:
+    """Draws a histogram from counts computed with NumPy.
+
+    Supports the same statistics as `seaborn.histplot`, without its
+    conversion of the data to long-form.
+
+    Args:
+        ax: Axes to draw on.
+        values: Values to count. Missing values are ignored.
+        bins: Number of bins or binning strategy for `np.histogram`.
+        stat: Statistic of each bin, "count", "frequency", "probability",
+          "proportion", "percent" or "density".
+        cumulative: Draw the cumulative statistic.
+    """
+    counts, edges = np.histogram(values.dropna(), bins=bins)
+    widths = np.diff(edges)
+    total = max(counts.sum(), 1)
+    if stat == "count":
+        heights = counts
+    elif stat == "frequency":
+        heights = counts / widths
+    elif stat in ("probability", "proportion"):
+        heights = counts / total
+    elif stat == "percent":
+        heights = 100 * counts / total
+    elif stat == "density":
+        heights = counts / (total * widths)
+    else:
+        raise ValueError(f"Invalid stat: {stat}.")
+    if cumulative:
+        if stat in ("frequency", "density"):
+            heights = np.cumsum(heights * widths)
+        else:
+            heights = np.cumsum(heights)
+    ax.bar(
+        edges[:-1],
+        heights,
+        width=widths,
+        align="edge",
+        alpha=0.75,
+        edgecolor="white",
+    )
+
+
 def plot_metrics(
     metrics: pd.DataFrame,
     bins: str = 10,
@@ -11,15 +76,16 @@ def plot_metrics(
     stat="count",
     cumulative=False,
     plot_title: str = None,
+    save_path: str = None,
 ) -> None:
     args = {"bins": bins, "stat": stat, "cumulative": cumulative}
     # plot the distribution of precision, recall, f1 and kendall tau
     fig, axes = plt.subplots(ncols=4, figsize=figsize, sharey=sharey)
 
-    sns.histplot(metrics["precision"], ax=axes[0], **args)
-    sns.histplot(metrics["recall"], ax=axes[1], **args)
-    sns.histplot(metrics["f1"], ax=axes[2], **args)
-    sns.histplot(metrics["kendall_tau"], ax=axes[3], **args)
+    histogram(axes[0], metrics["precision"], **args)
+    histogram(axes[1], metrics["recall"], **args)
+    histogram(axes[2], metrics["f1"], **args)
+    histogram(axes[3], metrics["kendall_tau"], **args)
 
     axes[0].set_title("Precision")
     axes[1].set_title("Recall")
@@ -38,7 +104,63 @@ def plot_metrics(
         fig.suptitle(plot_title)
 
     plt.tight_layout()
-    plt.show()
+    show_or_save(fig, save_path)
+
+
+def melt_metrics(df: pd.DataFrame, id_vars: list = None) -> pd.DataFrame:
+    """Converts metrics to the long-form data used by `metrics_bar_plot`.
+
+    Melt the metrics once and pass them as `pre_melted` when plotting the
+    same metrics several times.
+
+    Args:
+        df: DataFrame containing the metrics.
+        id_vars: Columns to keep as identifiers, after renaming. Defaults to
+          ["Threshold"], and must include the col and row of the plot.
+
+    Returns:
+        DataFrame with one row per metric value.
+    """
+    df_tmp = df.rename(
+        columns={
+            "precision": "Precision",
+            "recall": "Recall",
+            "f1": "F1-score",
+            "kendall_tau": "Kendall's $\\tau$",
+            "threshold": "Threshold",
+        }
+    )
+
+    return df_tmp.melt(
+        id_vars=id_vars or ["Threshold"],
+        value_vars=["Precision", "Recall", "F1-score", "Kendall's $\\tau$"],
+    )
+
+
+def melt_rouge_scores(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts ROUGE scores to the long-form data used by
+    `plot_rouge_scores`.
+
+    Args:
+        df: DataFrame containing the ROUGE scores.
+
+    Returns:
+        DataFrame with one row per score.
+    """
+    df_tmp = df.rename(
+        columns={
+            "rouge1": "ROUGE-1",
+            "rouge2": "ROUGE-2",
+            "rougeL": "ROUGE-L",
+        }
+    )
+
+    return df_tmp.melt(
+        id_vars="Method",
+        value_vars=["ROUGE-1", "ROUGE-2", "ROUGE-L"],
+        var_name="Metric",
+        value_name="Value",
+    )
 
 
 def metrics_bar_plot(
@@ -49,6 +171,8 @@ def metrics_bar_plot(
     row: str = None,
     col_wrap: int = None,
     kind: str = "bar",
+    save_path: str = None,
+    pre_melted: pd.DataFrame = None,
 ) -> plt.Figure:
     args = {}
     id_vars = ["Threshold"]
@@ -61,20 +185,7 @@ def metrics_bar_plot(
     if col_wrap:
         args["col_wrap"] = col_wrap
 
-    df_tmp = df.rename(
-        columns={
-            "precision": "Precision",
-            "recall": "Recall",
-            "f1": "F1-score",
-            "kendall_tau": "Kendall's $\\tau$",
-            "threshold": "Threshold",
-        }
-    )
-
-    df_plot = df_tmp.melt(
-        id_vars=id_vars,
-        value_vars=["Precision", "Recall", "F1-score", "Kendall's $\\tau$"],
-    )
+    df_plot = melt_metrics(df, id_vars) if pre_melted is None else pre_melted
 
     fig = sns.catplot(
         data=df_plot,
@@ -92,12 +203,15 @@ def metrics_bar_plot(
     if plot_title:
         plt.suptitle(plot_title)
     plt.tight_layout()
-    plt.show()
+    show_or_save(fig.figure, save_path)
     return fig
 
 
 def plot_dataset_stats(
-    df: pd.DataFrame, figsize: tuple = (10, 3), plot_title: str = None
+    df: pd.DataFrame,
+    figsize: tuple = (10, 3),
+    plot_title: str = None,
+    save_path: str = None,
 ) -> None:
     """Plot the distribution of the dataset statistics.
 
@@ -105,6 +219,7 @@ def plot_dataset_stats(
         df: DataFrame containing the dataset statistics.
         figsize: Size of the plot.
         plot_title: Title of the plot.
+        save_path: Save the plot to this path instead of showing it.
 
     Returns:
         None
@@ -130,12 +245,14 @@ def plot_dataset_stats(
         fig.suptitle(plot_title)
 
     plt.tight_layout()
-    plt.show()
+    show_or_save(fig, save_path)
 
 def plot_rouge_scores(
     df: pd.DataFrame,
     figsize: tuple = (10, 3),
     plot_title: str = None,
+    save_path: str = None,
+    pre_melted: pd.DataFrame = None,
     **kwargs,
 ) -> plt.Figure:
     """Plot the distribution of the ROUGE scores.
@@ -144,24 +261,14 @@ def plot_rouge_scores(
         df: DataFrame containing the ROUGE scores.
         figsize: Size of the plot.
         plot_title: Title of the plot.
+        save_path: Save the plot to this path instead of showing it.
+        pre_melted: Scores from `melt_rouge_scores`, to reuse when plotting
+          the same scores several times. Replaces df.
 
     Returns:
         None
     """
-    df_tmp = df.rename(
-        columns={
-            "rouge1": "ROUGE-1",
-            "rouge2": "ROUGE-2",
-            "rougeL": "ROUGE-L",
-        }
-    )
-
-    df_plot = df_tmp.melt(
-        id_vars="Method",
-        value_vars=["ROUGE-1", "ROUGE-2", "ROUGE-L"],
-        var_name="Metric",
-        value_name="Value",
-    )
+    df_plot = melt_rouge_scores(df) if pre_melted is None else pre_melted
 
     fig = sns.catplot(
         data=df_plot,
@@ -179,7 +286,7 @@ def plot_rouge_scores(
     if plot_title:
         plt.suptitle(plot_title)
     plt.tight_layout()
-    plt.show()
+    show_or_save(fig.figure, save_path)
     return fig
 
 
@@ -1,23 +1,63 @@
 import evaluate
 
-rogue = evaluate.load("rouge")
+from functools import lru_cache
+
+ROUGE_TYPES = ["rouge1", "rouge2", "rougeL"]
+
+
+@lru_cache(maxsize=None)
+def get_rouge() -> evaluate.EvaluationModule:
+    """Returns the ROUGE metric, loaded on first use."""
+    return evaluate.load("rouge")
 
 
 def calculate_rouge_score(
     predictions: list[str],
-    references: list[str]
+    references: list[str],
+    use_aggregator: bool = True,
+    use_stemmer: bool = False,
 ) -> dict:
     """Calculate ROUGE score.
 
     Args:
         predictions: List of predictions.
         references: List of references.
+        use_aggregator: Return aggregated scores. Otherwise return a list of
+          scores for each prediction and reference pair.
+        use_stemmer: Stem words before matching them.
 
     Returns:
         ROUGE score.
     """
-    return rogue.compute(
+    return get_rouge().compute(
         predictions=predictions,
         references=references,
-        rouge_types=["rouge1", "rouge2", "rougeL"],
+        rouge_types=ROUGE_TYPES,
+        use_aggregator=use_aggregator,
+        use_stemmer=use_stemmer,
+    )
+
+
+def calculate_rouge_score_batch(
+    predictions: list[str],
+    references: list[str],
+    use_stemmer: bool = False,
+) -> list[dict]:
+    """Calculate ROUGE scores for many prediction and reference pairs in a
+    single call.
+
+    Args:
+        predictions: List of predictions.
+        references: List of references.
+        use_stemmer: Stem words before matching them.
+
+    Returns:
+        ROUGE score of each pair.
+    """
+    scores = calculate_rouge_score(
+        predictions, references, use_aggregator=False, use_stemmer=use_stemmer
     )
+    return [
+        {rouge_type: scores[rouge_type][k] for rouge_type in ROUGE_TYPES}
+        for k in range(len(predictions))
+    ]
@@ -1,26 +1,47 @@
 import logging
 import numpy as np
+import orjson
 import os
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from scipy.stats import kendalltau
 
 from tex2beam import utils
 from tex2beam.classes.latex_presentation import LatexPresentation
 from tex2beam.classes.latex_report import LatexReport
-from tex2beam.metrics.rouge_score import calculate_rouge_score
-from tex2beam.metrics.bert_score import calculate_bert_score
+from tex2beam.metrics.rouge_score import (
+    calculate_rouge_score,
+    calculate_rouge_score_batch,
+)
+from tex2beam.metrics.bert_score import (
+    calculate_bert_score,
+    calculate_bert_score_matrix,
+)
 
 logger = logging.getLogger(__name__)
 
+# Longest match list for which Kendall tau is calculated pairwise instead of
+# with scipy
+KENDALL_TAU_MAX_PAIRWISE = 1024
 
-def scoring(predictions: list, references: list, method="ROUGE") -> dict:
+
+def scoring(
+    predictions: list,
+    references: list,
+    method="ROUGE",
+    batch_size: int = 64,
+) -> dict:
     """Scores two strings using ROUGE and BERTScore. For each prediction a score
     is calculated against each of the references.
 
+    All pairs are scored in a single call.
+
     Args:
         predictions: List.
         references: List.
+        batch_size: Number of pairs per BERTScore encoder batch.
 
     Returns:
         Dictionary with ROUGE and BERTScore metrics.
@@ -33,30 +54,114 @@ def scoring(predictions: list, references: list, method="ROUGE") -> dict:
     if not references:
         raise ValueError("References is empty.")
 
-    scores = {}
-    for pred in predictions:
-        if not pred:
-            raise ValueError("Prediction is empty.")
-        scores[pred] = {}
-        for ref in references:
-            if not ref:
-                raise ValueError("Reference is empty.")
-            if method.lower() == "bert":
-                # Evaluate BERTScore
-                scores[pred][ref] = calculate_bert_score([pred], [ref])
-            elif method.lower() == "rouge":
-                # Evaluate ROUGE
-                scores[pred][ref] = calculate_rouge_score([pred], [ref])
+    if not all(predictions):
+        raise ValueError("Prediction is empty.")
+    if not all(references):
+        raise ValueError("Reference is empty.")
+
+    # Flatten the pairs, prediction by prediction
+    flat_preds = [pred for pred in predictions for _ in references]
+    flat_refs = list(references) * len(predictions)
+    scores = {pred: {} for pred in predictions}
+    if method.lower() == "bert":
+        # Evaluate BERTScore
+        bertscore = calculate_bert_score(
+            flat_preds, flat_refs, batch_size=batch_size
+        )
+        for k, (pred, ref) in enumerate(zip(flat_preds, flat_refs)):
+            scores[pred][ref] = {
+                key: [bertscore[key][k]]
+                for key in ("precision", "recall", "f1")
+            }
+    elif method.lower() == "rouge":
+        # Evaluate ROUGE
+        rouge_scores = calculate_rouge_score_batch(flat_preds, flat_refs)
+        for pred, ref, rouge_score in zip(flat_preds, flat_refs, rouge_scores):
+            scores[pred][ref] = rouge_score
 
     return scores
 
 
+def find_matches(
+    candidate_elements: list,
+    reference_elements: list,
+    f1_threshold: float = 0.6,
+) -> dict:
+    """Match candidate elements to reference elements based on BERTScore F1
+    score.
+
+    The matches are stored column-wise, one array per field, with the matches
+    ordered by candidate index and then by reference index.
+
+    Args:
+        candidate_elements (list): list of unique candidate elements
+        reference_elements (list): list of unique reference elements
+        f1_threshold (float, optional): F1 threshold for matching. Defaults
+          to 0.6.
+
+    Returns:
+        dict: candidate indices, reference indices, precision, recall and F1
+          score of the matches
+    """
+    # Calculate BERTScore for all candidate and reference pairs
+    bertscore = calculate_bert_score_matrix(
+        candidate_elements, reference_elements
+    )
+    candidate_indices, reference_indices = np.nonzero(
+        bertscore["f1"] >= f1_threshold
+    )
+    matches = {
+        "candidate_index": candidate_indices.astype(np.int32),
+        "reference_index": reference_indices.astype(np.int32),
+    }
+    for key in ("precision", "recall", "f1"):
+        matches[key] = bertscore[key][candidate_indices, reference_indices]
+    return matches
+
+
+def matches_to_dicts(
+    candidate_elements: list,
+    reference_elements: list,
+    matches: dict,
+    decimals: int = 3,
+) -> list:
+    """Convert matches from `find_matches` to a list of match dictionaries.
+
+    Args:
+        candidate_elements (list): list of unique candidate elements
+        reference_elements (list): list of unique reference elements
+        matches (dict): matches from `find_matches`
+        decimals (int, optional): Decimals of the scores. Defaults to 3.
+
+    Returns:
+        list: list of matched elements and their scores
+    """
+    return [
+        {
+            "candidate": {"element": candidate_elements[i], "index": i},
+            "reference": {"element": reference_elements[j], "index": j},
+            "score": {
+                "precision": round(precision, decimals),
+                "recall": round(recall, decimals),
+                "f1": round(f1, decimals),
+            },
+        }
+        for i, j, precision, recall, f1 in zip(
+            matches["candidate_index"].tolist(),
+            matches["reference_index"].tolist(),
+            matches["precision"].tolist(),
+            matches["recall"].tolist(),
+            matches["f1"].tolist(),
+        )
+    ]
+
+
 def match_elements(
     candidate_elements: list,
     reference_elements: list,
     f1_threshold: float = 0.6,
     decimals: int = 3,
-) -> dict:
+) -> list:
     """Match candidate elements to reference elements based on BERTScore F1
     score.
 
@@ -66,7 +171,7 @@ def match_elements(
         f1_threshold (float, optional): F1 threshold for matching. Defaults to 0.6.
 
     Returns:
-        dict: dictionary of matched elements
+        list: list of matched elements
     """
     logger.debug("Matching candidate elements to reference elements.")
 
@@ -74,71 +179,82 @@ def match_elements(
     candidate_elements = list(dict.fromkeys(candidate_elements))
     reference_elements = list(dict.fromkeys(reference_elements))
 
-    # Generate possible permutations
-    permutations = []
-    for i, ct in enumerate(candidate_elements):
-        for j, rt in enumerate(reference_elements):
-            permutations.append((ct, i, rt, j))
-
-    # Calculate BERTScore for all permutations
-    bertscore = calculate_bert_score(
-        [cand for cand, _, ref, _ in permutations],
-        [ref for cand, _, ref, _ in permutations],
+    matches = find_matches(candidate_elements, reference_elements, f1_threshold)
+    return matches_to_dicts(
+        candidate_elements, reference_elements, matches, decimals
     )
 
-    # Update function to append matches
-    def append(cand, i, ref, j, precision, recall, f1):
-        matches.append(
-            {
-                "candidate": {"element": cand, "index": i},
-                "reference": {"element": ref, "index": j},
-                "score": {
-                    "precision": round(precision, decimals),
-                    "recall": round(recall, decimals),
-                    "f1": round(f1, decimals),
-                },
-            }
-        )
 
-    matches = []
-    for k, (cand, i, ref, j) in enumerate(permutations):
-        # Check for exact matches
-        if cand == ref:
-            append(cand, i, ref, j, 1.0, 1.0, 1.0)
-            continue
-        else:
-            precision = bertscore["precision"][k]
-            recall = bertscore["recall"][k]
-            f1 = bertscore["f1"][k]
-        if f1 >= f1_threshold:
-            append(cand, i, ref, j, precision, recall, f1)
-    return matches
+def count_confusion_matrix(
+    n_candidates: int,
+    n_references: int,
+    candidate_indices: np.array,
+    reference_indices: np.array,
+) -> np.array:
+    """Generate confusion matrix from the indices of the matched elements.
+
+    Args:
+        n_candidates (int): number of unique candidate elements
+        n_references (int): number of unique reference elements
+        candidate_indices (np.array): candidate index of each match
+        reference_indices (np.array): reference index of each match
+
+    Returns:
+        np.array: confusion matrix
+    """
+    TP, TN = len(candidate_indices), 0
+    candidate_matched = np.zeros(n_candidates, dtype=bool)
+    candidate_matched[candidate_indices] = True
+    reference_matched = np.zeros(n_references, dtype=bool)
+    reference_matched[reference_indices] = True
+    FP = int((~candidate_matched).sum())
+    FN = int((~reference_matched).sum())
+
+    return np.array([[TP, FP], [FN, TN]])
+
+
+def get_match_indices(matches: list) -> tuple:
+    """Returns the candidate and reference indices of match dictionaries.
+
+    Args:
+        matches (list): list of matched elements
+
+    Returns:
+        tuple: arrays of candidate indices and reference indices
+    """
+    candidate_indices = np.fromiter(
+        (match["candidate"]["index"] for match in matches),
+        dtype=np.int32,
+        count=len(matches),
+    )
+    reference_indices = np.fromiter(
+        (match["reference"]["index"] for match in matches),
+        dtype=np.int32,
+        count=len(matches),
+    )
+    return candidate_indices, reference_indices
 
 
 def calculate_confusion_matrix(
-    candidate_titles: list, reference_titles: list, matches: dict
+    candidate_titles: list, reference_titles: list, matches: list
 ) -> np.array:
     """Generate confusion matrix based on matched elements.
 
     Args:
         candidate_titles (list): candidate elements
         reference_titles (list): reference elements
-        matches (dict): matched elements
+        matches (list): matched elements
 
     Returns:
         np.array: confusion matrix
     """
     logger.debug("Generating confusion matrix.")
-    TP, FP, FN, TN = 0, 0, 0, 0
-    TP = len(matches)
-    FP = len(set(candidate_titles)) - len(
-        set([match["candidate"]["element"] for match in matches])
+    # The indices refer to the unique elements
+    return count_confusion_matrix(
+        len(set(candidate_titles)),
+        len(set(reference_titles)),
+        *get_match_indices(matches),
     )
-    FN = len(set(reference_titles)) - len(
-        set([match["reference"]["element"] for match in matches])
-    )
-
-    return np.array([[TP, FP], [FN, TN]])
 
 
 def calculate_precision_recall_f1(
@@ -167,30 +283,79 @@ def calculate_precision_recall_f1(
     }
 
 
-def calculate_kendall_tau(matches: dict, decimals: int = 3, **kwargs) -> float:
+def kendall_tau_b(x: np.array, y: np.array) -> float:
+    """Calculates Kendall's tau-b from the signs of all pairwise differences.
+
+    Gives the same statistic as `scipy.stats.kendalltau`, without the
+    p-value. Uses O(n^2) memory, so it is meant for short sequences.
+
+    Args:
+        x (np.array): first sequence
+        y (np.array): second sequence
+
+    Returns:
+        float: Kendall's tau-b, or NaN if either sequence is constant.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    upper = np.triu_indices(len(x), k=1)
+    x_signs = np.sign(np.subtract.outer(x, x)[upper])
+    y_signs = np.sign(np.subtract.outer(y, y)[upper])
+    # Pairs tied in a sequence do not count towards its denominator
+    denominator = np.sqrt(
+        float(np.count_nonzero(x_signs)) * float(np.count_nonzero(y_signs))
+    )
+    if denominator == 0:
+        return np.nan
+    return float(np.dot(x_signs, y_signs)) / denominator
+
+
+def kendall_tau(
+    candidate_indices: np.array,
+    reference_indices: np.array,
+    decimals: int = 3,
+    **kwargs,
+) -> float:
     """Calculates the Kendall Tau correlation between the candidate and
-    reference indices.
+    reference indices of the matches.
 
     Args:
-        matches (dict): A dictionary containing the matches between the 
-          candidate and reference titles.
+        candidate_indices (np.array): candidate index of each match
+        reference_indices (np.array): reference index of each match
         **kwargs: Additional arguments to pass to `scipy.stats.kendalltau`.
+          Without arguments, short sequences are handled by `kendall_tau_b`.
 
     Returns:
         float: The Kendall Tau correlation.
     """
     logger.debug("Calculating Kendall tau.")
     # If we have only one item then we set the Kendall Tau to 1
-    if len(matches) == 1:
+    if len(candidate_indices) == 1:
         return 1.0
-    candidate_indices = [match["candidate"]["index"] for match in matches]
-    reference_indices = [match["reference"]["index"] for match in matches]
-    kendall_tau = kendalltau(
-        candidate_indices, reference_indices, **kwargs
-    ).statistic
-    if np.isnan(kendall_tau):
+    if kwargs or len(candidate_indices) > KENDALL_TAU_MAX_PAIRWISE:
+        tau = kendalltau(
+            candidate_indices, reference_indices, **kwargs
+        ).statistic
+    else:
+        tau = kendall_tau_b(candidate_indices, reference_indices)
+    if np.isnan(tau):
         return 0.0
-    return round(kendall_tau, decimals)
+    return round(float(tau), decimals)
+
+
+def calculate_kendall_tau(matches: list, decimals: int = 3, **kwargs) -> float:
+    """Calculates the Kendall Tau correlation between the candidate and
+    reference indices.
+
+    Args:
+        matches (list): A list containing the matches between the 
+          candidate and reference titles.
+        **kwargs: Additional arguments to pass to `scipy.stats.kendalltau`.
+
+    Returns:
+        float: The Kendall Tau correlation.
+    """
+    return kendall_tau(*get_match_indices(matches), decimals, **kwargs)
 
 
 def calculate_metrics(
@@ -214,19 +379,48 @@ def calculate_metrics(
             )
         return scores
 
-    matches = match_elements(candidates, references, f1_threshold)
-    confusion_matrix = calculate_confusion_matrix(
-        candidates, references, matches
+    # Match the unique elements, keeping the matches as arrays until they
+    # are converted to dictionaries for the output
+    candidate_elements = list(dict.fromkeys(candidates))
+    reference_elements = list(dict.fromkeys(references))
+    if candidate_elements and reference_elements:
+        matches = find_matches(
+            candidate_elements, reference_elements, f1_threshold
+        )
+    else:
+        matches = None
+    # Without matches all scores are zero, which also avoids dividing by
+    # zero when there are no candidates
+    if matches is None or not len(matches["f1"]):
+        return {
+            "candidates": candidates,
+            "references": references,
+            "matches": [],
+            "confusion_matrix": [
+                [0, len(candidate_elements)],
+                [len(reference_elements), 0],
+            ],
+            "precision_recall_f1": {"precision": 0.0, "recall": 0.0, "f1": 0.0},
+            "kendall_tau": 0.0,
+        }
+    confusion_matrix = count_confusion_matrix(
+        len(candidate_elements),
+        len(reference_elements),
+        matches["candidate_index"],
+        matches["reference_index"],
     )
     precision_recall_f1 = calculate_precision_recall_f1(confusion_matrix)
-    kendall_tau = calculate_kendall_tau(matches)
     return {
         "candidates": candidates,
         "references": references,
-        "matches": matches,
+        "matches": matches_to_dicts(
+            candidate_elements, reference_elements, matches
+        ),
         "confusion_matrix": confusion_matrix.tolist(),
         "precision_recall_f1": precision_recall_f1,
-        "kendall_tau": kendall_tau,
+        "kendall_tau": kendall_tau(
+            matches["candidate_index"], matches["reference_index"]
+        ),
     }
 
 def report_statistics(
@@ -236,18 +430,12 @@ def report_statistics(
     section_count = []
     word_count = []
 
-    report_paths = []
-    if subfolder:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if subfolder in root and file.endswith(file_suffix):
-                    report_paths.append(os.path.join(root, file))
-    else:
-        report_paths = [
-            os.path.join(folder_path, file)
-            for file in os.listdir(folder_path)
-            if file.endswith(file_suffix)
-        ]
+    # Without a subfolder, only the files in folder_path are read
+    report_paths = list(
+        utils.iter_files(
+            folder_path, (file_suffix,), subfolder, recursive=bool(subfolder)
+        )
+    )
 
     for item_path in report_paths:
         if not utils.determine_main_tex_file([item_path]):
@@ -279,18 +467,12 @@ def presentation_statistics(
     bullets_per_frame = []
     words_per_frame = []
 
-    presentation_paths = []
-    if subfolder:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if subfolder in root and file.endswith(file_suffix):
-                    presentation_paths.append(os.path.join(root, file))
-    else:
-        presentation_paths = [
-            os.path.join(folder_path, file)
-            for file in os.listdir(folder_path)
-            if file.endswith(".tex")
-        ]
+    # Without a subfolder, only the files in folder_path are read
+    presentation_paths = list(
+        utils.iter_files(
+            folder_path, (file_suffix,), subfolder, recursive=bool(subfolder)
+        )
+    )
 
     for item_path in presentation_paths:
         try:
@@ -315,110 +497,217 @@ def presentation_statistics(
     )
 
 
+def get_reference_file(candidate_file: str, reference_folder: str) -> str:
+    """Returns the path of the reference presentation of a candidate.
+
+    Args:
+        candidate_file: Path to the candidate presentation.
+        reference_folder: Folder with the reference presentations.
+
+    Returns:
+        Path to the reference presentation, or None if the candidate is not
+        a presentation or has no reference presentation.
+    """
+    # Generate reference file path
+    if candidate_file.endswith("-presentation-beamer.tex"):
+        basename = os.path.basename(candidate_file).replace(
+            "-presentation-beamer.tex", "-presentation.tex"
+        )
+    elif candidate_file.endswith(".tex"):
+        basename = os.path.basename(candidate_file).replace(
+            ".tex", "-presentation.tex"
+        )
+    else:
+        logger.warning(
+            f"Skipping {candidate_file} as it is not a LaTeX Beamer "
+            "presentation."
+        )
+        return None
+    reference_subfolder = os.path.join(
+        basename.rstrip("-presentation.tex"), "presentation-latex"
+    )
+    reference_file = os.path.join(
+        reference_folder, reference_subfolder, basename
+    )
+
+    # Check if reference file exists
+    if not os.path.exists(reference_file):
+        logger.warning(
+            f"Skipping {candidate_file} as reference file {reference_file} "
+            "does not exist."
+        )
+        return None
+    return reference_file
+
+
+@lru_cache(maxsize=256)
+def load_reference_presentation(reference_file: str) -> LatexPresentation:
+    """Returns the parsed reference presentation, which is shared by the
+    candidates generated from the same report."""
+    return LatexPresentation(reference_file)
+
+
+def read_presentations(candidate_file: str, reference_folder: str) -> tuple:
+    """Reads a candidate presentation and its reference presentation.
+
+    Args:
+        candidate_file: Path to the candidate presentation.
+        reference_folder: Folder with the reference presentations.
+
+    Returns:
+        Candidate and reference presentations, or None if the presentations
+        could not be read.
+    """
+    reference_file = get_reference_file(candidate_file, reference_folder)
+    if not reference_file:
+        return None
+    logger.debug(f"Processing {candidate_file}.")
+
+    try:
+        return (
+            LatexPresentation(candidate_file),
+            load_reference_presentation(reference_file),
+        )
+    except Exception as e:
+        logger.error(f"Error reading presentations: {e}")
+        return None
+
+
+def read_rouge_scores(candidate_file: str, reference_folder: str) -> dict:
+    """Scores a candidate presentation against its reference presentation
+    with ROUGE.
+
+    Args:
+        candidate_file: Path to the candidate presentation.
+        reference_folder: Folder with the reference presentations.
+
+    Returns:
+        ROUGE scores, or None if the presentations could not be read or
+        scored.
+    """
+    presentations = read_presentations(candidate_file, reference_folder)
+    if not presentations:
+        return None
+    candidate_presentation, reference_presentation = presentations
+    try:
+        return calculate_rouge_score(
+            [str(candidate_presentation.contents)],
+            [str(reference_presentation.contents)],
+        )
+    except Exception as e:
+        logger.error(f"Error evaluating metrics for {candidate_file}: {e}")
+        return None
+
+
+def read_frame_titles(candidate_file: str, reference_folder: str) -> dict:
+    """Reads the frame titles of a candidate presentation and its reference
+    presentation.
+
+    Args:
+        candidate_file: Path to the candidate presentation.
+        reference_folder: Folder with the reference presentations.
+
+    Returns:
+        Candidate and reference frame titles, or None if the presentations
+        could not be read.
+    """
+    presentations = read_presentations(candidate_file, reference_folder)
+    if not presentations:
+        return None
+    candidate_presentation, reference_presentation = presentations
+    candidate_elements = candidate_presentation.frame_titles
+    logger.debug(candidate_elements)
+    reference_elements = reference_presentation.frame_titles
+    logger.debug(reference_elements)
+    return {"candidates": candidate_elements, "references": reference_elements}
+
+
+def read_contents(candidate_file: str, reference_folder: str) -> dict:
+    """Reads the contents of a candidate presentation and its reference
+    presentation.
+
+    Args:
+        candidate_file: Path to the candidate presentation.
+        reference_folder: Folder with the reference presentations.
+
+    Returns:
+        Candidate and reference contents, or None if the presentations could
+        not be read.
+    """
+    presentations = read_presentations(candidate_file, reference_folder)
+    if not presentations:
+        return None
+    candidate_presentation, reference_presentation = presentations
+    return {
+        "candidates": candidate_presentation.contents,
+        "references": reference_presentation.contents,
+    }
+
+
 def folder_metrics(
     candidate_folder: str,
     reference_folder: str,
     output_file: str,
     match: str = "title",
     scoring_method: str = "bert",
+    workers: int = None,
     **kwargs,
 ) -> None:
     """Walks through a folder of candidate presentations and compares them
-    against the reference presentations."""
-
-    def handle_metrics(candidate_file, reference_folder, **kwargs):
-        # Generate reference file path
-        if candidate_file.endswith("-presentation-beamer.tex"):
-            basename = os.path.basename(candidate_file).replace(
-                "-presentation-beamer.tex", "-presentation.tex"
-            )
-        elif candidate_file.endswith(".tex"):
-            basename = os.path.basename(candidate_file).replace(
-                ".tex", "-presentation.tex"
-            )
-        else:
-            logger.warning(
-                f"Skipping {candidate_file} as it is not a LaTeX Beamer presentation."
-            )
-            return
-        reference_subfolder = os.path.join(
-            basename.rstrip("-presentation.tex"), "presentation-latex"
-        )
-        reference_file = os.path.join(
-            reference_folder, reference_subfolder, basename
-        )
+    against the reference presentations.
 
-        # Check if reference file exists
-        if not os.path.exists(reference_file):
-            logger.warning(
-                f"Skipping {candidate_file} as reference file {reference_file} does not exist."
-            )
-            return
-        logger.debug(f"Processing {candidate_file}.")
-
-        # Read candidate and reference presentations
-        try:
-            candidate_presentation = LatexPresentation(candidate_file)
-            reference_presentation = LatexPresentation(reference_file)
-        except Exception as e:
-            logger.error(f"Error reading presentations: {e}")
-            return
-
-        # Evaluate metrics using ROUGE metrics
-        if scoring_method == "rouge":
-            try:
-                results = calculate_rouge_score(
-                    [str(candidate_presentation.contents)],
-                    [str(reference_presentation.contents)],
-                )
-                results["file"] = candidate_file
-                utils.write_dict_to_jsonl(
-                    content=results,
-                    file_path=output_file,
-                )
-                return
-            except Exception as e:
-                logger.error(f"Error evaluating metrics for {candidate_file}: {e}")
-                return
-
-        # Evaluate metrics using BERTScore
-        # Match candidate and reference elements
-        if match == "title":
-            candidate_elements = candidate_presentation.frame_titles
-            logger.debug(candidate_elements)
-            reference_elements = reference_presentation.frame_titles
-            logger.debug(reference_elements)
-        elif match == "content":
-            candidate_elements = candidate_presentation.contents
-            reference_elements = reference_presentation.contents
-        else:
-            raise ValueError(
-                "Invalid match type. Valid options are 'title' and 'content'."
-            )
-
-        # Calculate metrics
-        try:
-            results = calculate_metrics(
-                candidates=candidate_elements,
-                references=reference_elements,
-                **kwargs,
-            )
+    The presentations are read, and scored with ROUGE, in a pool of worker
+    processes. BERTScore runs in this process, so the model is only loaded
+    once, while the workers read the next presentations.
 
+    Args:
+        candidate_folder: Folder with the candidate presentations.
+        reference_folder: Folder with the reference presentations.
+        output_file: Path to the output JSONL file.
+        match: Elements to match, "title" or "content".
+        scoring_method: "rouge" or "bert".
+        workers: Number of worker processes. Defaults to the number of CPUs.
+        **kwargs: Additional arguments to pass to `calculate_metrics`.
+    """
+    if match not in ("title", "content"):
+        raise ValueError(
+            "Invalid match type. Valid options are 'title' and 'content'."
+        )
+    # Select the reader and scorer once, instead of for every file. ROUGE
+    # scores are complete when they are read.
+    if scoring_method == "rouge":
+        read, score = read_rouge_scores, None
+    elif match == "title":
+        read, score = read_frame_titles, partial(calculate_metrics, **kwargs)
+    else:
+        read, score = read_contents, partial(calculate_metrics, **kwargs)
+    read = partial(read, reference_folder=reference_folder)
+    candidate_files = utils.folder_walker(path=candidate_folder)
+
+    # Results are written in this process, in the order of the files, through
+    # a single buffered file handle
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(
+        output_file, "ab", buffering=1 << 20
+    ) as file:
+        for candidate_file, results in zip(
+            candidate_files, executor.map(read, candidate_files)
+        ):
+            if results is None:
+                continue
+            # Evaluate metrics using BERTScore
+            if score is not None:
+                try:
+                    results = score(**results)
+                except Exception as e:
+                    logger.error(
+                        f"Error evaluating metrics for {candidate_file}: {e}"
+                    )
+                    continue
             results["file"] = candidate_file
-            utils.write_dict_to_jsonl(
-                content=results,
-                file_path=output_file,
+            file.write(
+                orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY)
+                + b"\n"
             )
-        except Exception as e:
-            logger.error(f"Error evaluating metrics for {candidate_file}: {e}")
-
-    # Walk through the candidate folder
-    utils.folder_walker(
-        path=candidate_folder,
-        callback=handle_metrics,
-        reference_folder=reference_folder,
-        **kwargs,
-    )
 
 
 def expand_confusion_matrix(confusion_matrix):
@@ -428,18 +717,28 @@ def expand_confusion_matrix(confusion_matrix):
 
 
 def expand_to_columns(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
-    for col in cols:
-        df_tmp = pd.concat([df, pd.DataFrame(df[col].tolist())], axis=1)
-        df_tmp.drop(col, axis=1, inplace=True)
-    return df_tmp
+    """Expands columns of dictionaries into one column per key.
+
+    Args:
+        df: DataFrame.
+        cols: Columns of dictionaries to expand.
+
+    Returns:
+        DataFrame with the expanded columns in place of the original ones.
+    """
+    parts = [
+        pd.json_normalize(df[col].tolist()).set_index(df.index)
+        for col in cols
+    ]
+    return pd.concat([df.drop(columns=cols), *parts], axis=1)
 
 
 def read_metrics_from_jsonl(filepath: str) -> pd.DataFrame:
     df = pd.read_json(filepath, lines=True)
     df = expand_to_columns(df, ["precision_recall_f1"])
-    df["f1_threshold"] = (
-        df["f1_threshold"].apply(lambda x: f"{x:.1f}").astype("str")
-    )
+    df["f1_threshold"] = np.char.mod(
+        "%.1f", df["f1_threshold"].to_numpy(dtype=np.float64)
+    ).astype(object)
     return df
 
 
@@ -1,6 +1,7 @@
 import argparse
 import logging
 
+from tex2beam.metrics import bert_score
 from tex2beam.metrics.utils import calculate_metrics, folder_metrics
 from tex2beam.classes.latex_presentation import LatexPresentation
 
@@ -14,6 +15,15 @@ def main(args: argparse.Namespace) -> None:
         args: Arguments from command-line call.
     """
     logger.info("Starting main function.")
+    if args.device:
+        # The BERTScore model is loaded once on this device and reused for
+        # all presentations
+        bert_score.DEVICE = args.device
+    bert_score.PRECISION = args.precision
+    if args.scoring_method == "bert" and bert_score.DEVICE == "cpu":
+        logger.warning(
+            "BERTScore runs on the CPU, which is much slower than on a GPU."
+        )
     if args.predictions_folder:
         folder_metrics(
             candidate_folder=args.predictions_folder,
@@ -21,6 +31,7 @@ def main(args: argparse.Namespace) -> None:
             output_file=args.output,
             match=args.match,
             scoring_method=args.scoring_method,
+            workers=args.workers,
             f1_threshold=args.threshold,
         )
     elif args.predictions_file:
@@ -80,6 +91,26 @@ def parse_args() -> argparse.Namespace:
         default="bert",
         choices=["rouge", "bert"],
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of processes used for reading the presentations",
+        default=None,
+    )
+    parser.add_argument(
+        "--device",
+        type=str,
+        help="Device for the BERTScore model, e.g. cuda or cpu. Defaults to "
+        "cuda if available",
+    )
+    parser.add_argument(
+        "--precision",
+        type=str,
+        help="Precision of the BERTScore model on CUDA",
+        default="bf16",
+        choices=["bf16", "fp16", "fp32"],
+    )
     # latex-path and source-folder are mutually exclusive
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
@@ -1,15 +1,56 @@
-import json
+import asyncio
+import contextlib
+import copy
 import logging
+import mmap
+import orjson
 import os
 import re
 import tarfile
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from TexSoup import TexSoup
 from TexSoup.data import TexNode
-from typing import Callable
+from typing import Callable, Iterator
 
 logger = logging.getLogger(__name__)
 
+# Buffer size of file reads and writes, instead of the default 8 KiB
+BUFFER_SIZE = 128 * 1024
+
+BEGIN_DOCUMENT_RE = re.compile(rb"\\begin{document}", re.IGNORECASE)
+# Commands resolved by `resolve`
+IMPORT_COMMANDS = ["subimport", "import", "include", "input"]
+# Number of parsed LaTeX files and sources kept by `soupify` and `make_soup`
+SOUP_CACHE_SIZE = 256
+# Commands holding the title and authors, in order of preference
+TITLE_COMMANDS = ("title", "icmltitle", "icmltitlerunning")
+AUTHOR_COMMANDS = ("author", "icmlauthor")
+# Commands read by `parse_latex_report`
+REPORT_COMMANDS = TITLE_COMMANDS + AUTHOR_COMMANDS + ("section",)
+
+
+def run_coroutine(coroutine):
+    """Runs a coroutine to completion from synchronous code.
+
+    If an event loop is already running in this thread, e.g. in a Jupyter
+    notebook, the coroutine is run in a new event loop in a separate thread.
+
+    Args:
+        coroutine: Coroutine to run.
+
+    Returns:
+        Result of the coroutine.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
 
 def clean_texfile(texfile: str) -> str:
     """Cleans a LaTeX file.
@@ -21,16 +62,18 @@ def clean_texfile(texfile: str) -> str:
         Cleaned LaTeX file.
     """
     logger.debug("Cleaning LaTeX file.")
-    # Split string into lines
-    tmp = texfile.split("\n")
-    # Remove comments
-    tmp = [line.strip() for line in tmp if not line.startswith("%")]
-    # Remove empty lines
-    tmp = [line for line in tmp if len(line) > 0]
-    # Remove multiple spaces
-    tmp = [re.sub(r" +", " ", line) for line in tmp]
+    lines = []
+    for line in texfile.split("\n"):
+        line = line.strip()
+        # Remove empty lines and comments
+        if not line or line[0] == "%":
+            continue
+        # Remove multiple spaces, keeping tabs. Most lines have none.
+        if "  " in line:
+            line = " ".join(filter(None, line.split(" ")))
+        lines.append(line)
     # Join lines back together
-    return "\n".join(tmp)
+    return "\n".join(lines)
 
 
 def read_file(file_path: str) -> str:
@@ -44,7 +87,7 @@ def read_file(file_path: str) -> str:
     """
     logger.debug(f"Reading file: {file_path}")
     try:
-        with open(file_path, "r") as file:
+        with open(file_path, "r", buffering=BUFFER_SIZE) as file:
             file_content = file.read()
     except Exception as e:
         logger.error(f"Error reading file {file_path}: {e}")
@@ -62,14 +105,13 @@ def write_file(content: str, output_path: str) -> None:
     logger.debug(f"Writing content to file: {output_path}")
     target_folder = os.path.dirname(output_path)
     # Create target folder if not existing
-    if not os.path.exists(target_folder):
+    if target_folder:
         try:
-            os.makedirs(target_folder)
-            logger.debug(f"Created target folder: {target_folder}")
+            os.makedirs(target_folder, exist_ok=True)
         except Exception as e:
             logger.error(f"Error creating target folder: {e}")
     # Write content to file
-    with open(output_path, "w") as file:
+    with open(output_path, "w", buffering=BUFFER_SIZE) as file:
         try:
             file.write(content)
             logger.info(f"Content written to file: {output_path}")
@@ -86,32 +128,93 @@ def write_dict_to_jsonl(content: dict, file_path: str) -> None:
     """
     logger.debug(f"Writing content to {file_path}")
     # Append to file if exists, otherwise create new file
-    mode = "a" if os.path.exists(file_path) else "w"
-    with open(file_path, mode) as file:
-        json.dump(content, file, ensure_ascii=False)
-        file.write("\n")
+    with open(file_path, "ab") as file:
+        file.write(
+            orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+        )
+
+
+def iter_jsonl(file_path: str) -> Iterator[dict]:
+    """Reads a JSONL file one record at a time.
+
+    Args:
+        file_path: Path to the file.
+
+    Yields:
+        The record on each line.
+    """
+    with open(file_path, "rb") as file:
+        for line in file:
+            yield orjson.loads(line)
 
 
 def read_dict_from_jsonl(file_path: str) -> dict:
     """Reads a JSONL file and returns its content as a dictionary.
 
     Args:
+        file_path: Path to the file.
 
     Returns:
+        The records of all lines merged into one dictionary.
     """
     content = {}
-    with open(file_path, "r") as f:
-        for line in f:
-            content.update(json.loads(line))
+    for record in iter_jsonl(file_path):
+        content.update(record)
     return content
 
 
+def iter_files(
+    path: str,
+    extensions: tuple = None,
+    subfolder: str = None,
+    recursive: bool = True,
+) -> Iterator[str]:
+    """Walks through a folder with `os.scandir`, in the same order as
+    `os.walk`, and yields the paths of the files.
+
+    Args:
+        path: Path to the folder.
+        extensions: Tuple of extensions to filter files.
+        subfolder: Only yield files in folders whose path contains subfolder.
+        recursive: Walk through the subfolders. Otherwise only the files in
+          the folder itself are yielded.
+
+    Yields:
+        Paths of the files.
+    """
+
+    def walk(folder: str, matched: bool) -> Iterator[str]:
+        # Once a folder path contains subfolder, so do all paths below it
+        matched = matched or subfolder in folder
+        files, folders = [], []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        # Like os.walk, do not follow symbolic links
+                        if recursive and not entry.is_symlink():
+                            folders.append(entry.path)
+                    elif matched and (
+                        not extensions or entry.name.endswith(extensions)
+                    ):
+                        files.append(entry.path)
+        except OSError as e:
+            logger.warning(f"Error reading folder {folder}: {e}")
+            return
+        yield from files
+        for sub_folder in folders:
+            yield from walk(sub_folder, matched)
+
+    yield from walk(path, not subfolder)
+
+
 def folder_walker(
     path: str,
     callback: Callable = None,
     extensions: str = None,
     subfolder: str = None,
     return_files: bool = True,
+    workers: int = 1,
     **kwargs,
 ) -> list:
     """Walks through a folder and return the path of files to the callback
@@ -121,6 +224,8 @@ def folder_walker(
         path: Path to the folder.
         callback: Callback function.
         extensions: List of extensions to filter files. Comma separated.
+        workers: Number of threads running the callback. Use more than one
+          for callbacks that mostly wait for I/O, and that are thread-safe.
         **kwargs: Additional arguments to pass to the callback function.
 
     Raises:
@@ -133,29 +238,49 @@ def folder_walker(
         raise FileNotFoundError(f"Path {path} does not exist.")
     if not os.path.isdir(path):
         raise NotADirectoryError(f"Path {path} is not a folder.")
+    if extensions:
+        extensions = tuple(extensions.split(","))
+    parallel = callback is not None and workers > 1
     file_paths = []
-    for root, dirs, files in os.walk(path):
-        if subfolder:
-            if subfolder not in root:
-                continue
-        if extensions:
-            files = [
-                file
-                for file in files
-                if file.endswith(tuple(extensions.split(",")))
-            ]
-        if callback:
-            for file in files:
-                callback(os.path.join(root, file), **kwargs)
-        file_paths.extend([os.path.join(root, file) for file in files])
+    with (
+        ThreadPoolExecutor(max_workers=workers)
+        if parallel
+        else contextlib.nullcontext()
+    ) as executor:
+        futures = []
+        for file_path in iter_files(path, extensions, subfolder):
+            if parallel:
+                futures.append(executor.submit(callback, file_path, **kwargs))
+            elif callback:
+                callback(file_path, **kwargs)
+            if return_files:
+                file_paths.append(file_path)
+        # Raise the exceptions of the callbacks, like the serial walk does
+        for future in futures:
+            future.result()
     if return_files:
         return file_paths
     return None
 
 
+@lru_cache(maxsize=SOUP_CACHE_SIZE)
+def parse_texfile(file_path: str, mtime: int, size: int) -> TexSoup:
+    """Parses a LaTeX file, cached by path, modification time and size."""
+    return TexSoup(read_file(file_path))
+
+
+@lru_cache(maxsize=SOUP_CACHE_SIZE)
+def parse_texsource(texfile: str) -> TexSoup:
+    """Parses LaTeX source, cached by the source."""
+    return TexSoup(texfile)
+
+
 def soupify(file_path: str) -> TexSoup:
     """Creates a TexSoup object from a LaTeX file.
 
+    Parsed files are cached, so files shared by several documents are only
+    parsed once. Callers get a copy, which they are free to modify.
+
     Args:
         file_path: Path to the LaTeX file.
 
@@ -164,8 +289,11 @@ def soupify(file_path: str) -> TexSoup:
     """
     logger.debug(f"Creating TexSoup object from {file_path}.")
     try:
-        soup = TexSoup(read_file(file_path))
-        return soup
+        stat = os.stat(file_path)
+        soup = parse_texfile(
+            os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+        )
+        return copy.deepcopy(soup)
     except Exception as e:
         logger.error(f"Error creating TexSoup object: {e}")
     return None
@@ -174,6 +302,8 @@ def soupify(file_path: str) -> TexSoup:
 def make_soup(texfile: str) -> TexSoup:
     """Creates a TexSoup object from a LaTeX file.
 
+    Parsed sources are cached, and callers get a copy, like in `soupify`.
+
     Args:
         texfile: LaTeX file.
 
@@ -182,8 +312,7 @@ def make_soup(texfile: str) -> TexSoup:
     """
     logger.debug("Creating TexSoup object.")
     try:
-        soup = TexSoup(texfile)
-        return soup
+        return copy.deepcopy(parse_texsource(texfile))
     except Exception as e:
         logger.error(f"Error creating TexSoup object: {e}")
     return None
@@ -192,6 +321,9 @@ def make_soup(texfile: str) -> TexSoup:
 def flatten_soup(soup: TexSoup, work_folder: str) -> list:
     """Flattens a TexSoup object.
 
+    The input commands are replaced in place by the flattened included
+    files, so the document is never parsed again.
+
     Args:
         soup: TexSoup object.
 
@@ -200,22 +332,30 @@ def flatten_soup(soup: TexSoup, work_folder: str) -> list:
     """
     if not soup:
         return None
-    while soup.input:
-        filename = soup.input.text[0]
+    for _input in list(soup.find_all("input")):
+        filename = _input.text[0]
         if not filename.endswith(".tex"):
             filename = filename + ".tex"
         include_file = os.path.join(work_folder, filename)
-        include_soup = soupify(include_file)
-        soup.input.replace_with(flatten_soup(include_soup, work_folder))
-    return make_soup(str(soup))
+        include_soup = flatten_soup(soupify(include_file), work_folder)
+        # Keep the input command if the file could not be read
+        if include_soup:
+            _input.replace_with(*include_soup.expr.all)
+    return soup
 
 
-def resolve(filehandle):
+def resolve(filehandle, cache: dict = None):
     """Resolve all import and update the parse tree.
 
+    All import commands are found in a single pass. Each included file is
+    resolved once, and every inclusion of it splices a copy of the cached
+    resolved nodes, including whitespace.
+
     source:
     https://github.com/alvinwan/TexSoup/blob/master/examples/resolve_imports.py
     """
+    if cache is None:
+        cache = {}
     # soupify
     soup = TexSoup(filehandle)
 
@@ -226,33 +366,21 @@ def resolve(filehandle):
             return filename + ".tex"
         return filename
 
-    # resolve subimports
-    for _subimport in soup.find_all("subimport"):
-        logger.debug(
-            f"Resolving subimport: {_subimport.args[0]}{_subimport.args[1]}"
-        )
-        path = _subimport.args[0] + _subimport.args[1]
-        _subimport.replace_with(*resolve(open(path)).contents)
-
-    # resolve imports
-    for _import in soup.find_all("import"):
-        filename = check_filename(_import.args[0].string)
-        logger.debug(f"Resolving import: {filename}")
-        _import.replace_with(*resolve(open(filename)).contents)
-
-    # resolve includes
-    for _include in soup.find_all("include"):
-        filename = check_filename(_include.args[0].string)
-        logger.debug(f"Resolving include: {filename}")
-        _include.replace_with(*resolve(open(filename)).contents)
-
-    # resolve inputs
-    for _input in soup.find_all("input"):
-        filename = check_filename(_input.args[0].string)
-        logger.debug(f"Resolving input: {filename}")
-        _input.replace_with(
-            *resolve(open(os.path.join(cwd, filename))).contents
-        )
+    for _import in list(soup.find_all(IMPORT_COMMANDS)):
+        if _import.name == "subimport":
+            path = _import.args[0] + _import.args[1]
+        elif _import.name == "input":
+            filename = check_filename(_import.args[0].string)
+            path = os.path.join(cwd, filename)
+        else:
+            path = check_filename(_import.args[0].string)
+        logger.debug(f"Resolving {_import.name}: {path}")
+        path = os.path.abspath(path)
+        if path not in cache:
+            with open(path) as file:
+                cache[path] = list(resolve(file, cache).expr.all)
+        # Every inclusion gets its own copy of the resolved nodes
+        _import.replace_with(*copy.deepcopy(cache[path]))
 
     return soup
 
@@ -269,23 +397,65 @@ def walk_the_soup(soup):
         walk_the_soup(child)
 
 
-def get_title(soup: TexSoup) -> str:
+def collect_nodes(soup: TexSoup, names: tuple) -> dict:
+    """Collects the nodes of several commands in a single traversal.
+
+    Args:
+        soup: TexSoup object.
+        names: Names of the commands.
+
+    Returns:
+        Dictionary of command names and their nodes, in document order.
+    """
+    nodes = {name: [] for name in names}
+    for node in soup.find_all(list(names)):
+        nodes[node.name].append(node)
+    return nodes
+
+
+def find_first(soup: TexSoup, names: tuple, nodes: dict = None) -> TexNode:
+    """Finds the first node of the first command that is present.
+
+    Args:
+        soup: TexSoup object.
+        names: Names of the commands, in order of preference.
+        nodes: Nodes from `collect_nodes`, searched instead of the soup.
+
+    Returns:
+        The node, or None if none of the commands are present.
+    """
+    if nodes is None:
+        # The commands are usually in the preamble, at the top level of the
+        # document, so look there before searching the whole document
+        top_level = {}
+        for child in soup.children:
+            if child.name in names:
+                top_level.setdefault(child.name, child)
+    for name in names:
+        if nodes is not None:
+            node = nodes[name][0] if nodes.get(name) else None
+        else:
+            node = top_level.get(name) or soup.find(name)
+        if node:
+            return node
+    return None
+
+
+def get_title(soup: TexSoup, nodes: dict = None) -> str:
     """Extracts the title from a LaTeX file.
 
     Args:
         soup: TexSoup object.
+        nodes: Nodes from `collect_nodes`, searched instead of the soup.
 
     Returns:
         Title.
     """
     title = None
     try:
-        if soup.find("title"):
-            title = soup.find("title").text
-        elif soup.find("icmltitle"):
-            title = soup.find("icmltitle").text
-        elif soup.find("icmltitlerunning"):
-            title = soup.find("icmltitlerunning").text
+        node = find_first(soup, TITLE_COMMANDS, nodes)
+        if node:
+            title = node.text
         else:
             logger.warning("No title found.")
     except Exception as e:
@@ -310,21 +480,21 @@ def get_title_from_texfile(filepath: str = None) -> str:
     return None
 
 
-def get_authors(soup: TexSoup) -> str:
+def get_authors(soup: TexSoup, nodes: dict = None) -> str:
     """Extracts authors from a LaTeX file.
 
     Args:
         soup: TexSoup object.
+        nodes: Nodes from `collect_nodes`, searched instead of the soup.
 
     Returns:
         Authors.
     """
     authors = None
     try:
-        if soup.find("author"):
-            authors = soup.find("author").text
-        elif soup.find("icmlauthor"):
-            authors = soup.find("icmlauthor").text
+        node = find_first(soup, AUTHOR_COMMANDS, nodes)
+        if node:
+            authors = node.text
         else:
             authors = ""
     except Exception as e:
@@ -336,18 +506,22 @@ def get_authors(soup: TexSoup) -> str:
     return None
 
 
-def get_sections(soup: TexSoup) -> list:
+def get_sections(soup: TexSoup, nodes: dict = None) -> list:
     """Extracts sections from a LaTeX file.
 
     Args:
         soup: TexSoup object.
+        nodes: Nodes from `collect_nodes`, searched instead of the soup.
 
     Returns:
         Sections.
     """
     sections = None
     try:
-        sections = soup.find_all("section")
+        if nodes is not None:
+            sections = nodes["section"]
+        else:
+            sections = soup.find_all("section")
         sections = [section.text[0] for section in sections if section.text]
     except Exception as e:
         logger.error(f"Error extracting sections: {e}")
@@ -421,8 +595,13 @@ def remove_sequential_frames(soup: TexSoup, threshold: float = 0.9) -> TexSoup:
 
         content = get_frame_contents(frame)
         if previous_frame and len(previous_content) > 0:
-            common_content = [c for c in previous_content if c in content]
-            if len(common_content) / len(previous_content) >= 0.95:
+            # Count the characters of the previous content which occur in the
+            # current content, by deleting those characters in one pass
+            missing = previous_content.translate(
+                str.maketrans("", "", "".join(set(content)))
+            )
+            common = len(previous_content) - len(missing)
+            if common / len(previous_content) >= 0.95:
                 previous_frame.delete()
 
         previous_frame = frame
@@ -460,9 +639,11 @@ def parse_latex_report(texfile: str, outfile: str = None) -> dict:
     logger.info(f"Parsing LaTeX file {texfile}")
     contents = read_file(texfile)
     soup = make_soup(contents)
-    title = get_title(soup)
-    authors = get_authors(soup)
-    sections = get_sections(soup)
+    # Find all commands in one traversal of the document
+    nodes = collect_nodes(soup, REPORT_COMMANDS) if soup else None
+    title = get_title(soup, nodes)
+    authors = get_authors(soup, nodes)
+    sections = get_sections(soup, nodes)
     parsed_content = {
         "file": texfile,
         "title": title,
@@ -490,8 +671,13 @@ def extract_archive(
     if subfolder:
         destination = os.path.join(destination, subfolder)
     try:
-        with tarfile.open(filepath, "r") as tar:
-            tar.extractall(destination)
+        # Extract the members while streaming through the archive, without
+        # seeking or building an index of the members first
+        with open(filepath, "rb", buffering=1 << 20) as file, tarfile.open(
+            fileobj=file, mode="r|*"
+        ) as tar:
+            for member in tar:
+                tar.extract(member, destination, set_attrs=False)
             logger.info(f"Archive extracted to: {destination}")
     except Exception as e:
         logger.warning(f"Error extracting archive {filepath}: {e}")
@@ -507,13 +693,38 @@ def group_files_by_folder(files: list, parent_path: str) -> dict:
     Returns:
         dict: dictionary of folders and files
     """
-    folders: dict[str, list] = {}
+    folders: dict[str, list] = defaultdict(list)
+    # Files are grouped by their first folder below the parent path
+    prefix_length = len(parent_path.rstrip("/")) + 1
     for file in files:
-        folder = file.strip(parent_path).split("/")[1]
-        if folder not in folders:
-            folders[folder] = []
-        folders[folder].append(file)
-    return folders
+        folders[file[prefix_length:].split("/", 1)[0]].append(file)
+    return dict(folders)
+
+
+def is_main_texfile(file_path: str, head_size: int = 65536) -> bool:
+    """Checks if a LaTeX file is a main file, i.e. has a document
+    environment.
+
+    The document environment almost always begins in the first few kilobytes,
+    so only the head of the file is read. Longer files without a match are
+    searched through a memory map instead of being read into memory. Both
+    are searched with the same precompiled pattern.
+
+    Args:
+        file_path: Path to the LaTeX file.
+        head_size: Number of bytes read from the start of the file.
+
+    Returns:
+        True if the file has a document environment.
+    """
+    with open(file_path, "rb") as file:
+        head = file.read(head_size)
+        if BEGIN_DOCUMENT_RE.search(head):
+            return True
+        if len(head) < head_size:
+            return False
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return bool(BEGIN_DOCUMENT_RE.search(mm))
 
 
 def determine_main_tex_file(files: list) -> str:
@@ -529,9 +740,7 @@ def determine_main_tex_file(files: list) -> str:
         if file.endswith(".tex"):
             # Check if file is the main LaTeX file
             try:
-                if re.search(
-                    r"\\begin{document}", open(file).read(), re.IGNORECASE
-                ):
+                if is_main_texfile(file):
                     return file
             except Exception as e:
                 logger.error(f"Error reading {file}: {e}")
@@ -540,6 +749,17 @@ def determine_main_tex_file(files: list) -> str:
 
 
 def remove_duplicates(elements: list) -> list:
+    """Removes duplicate elements, keeping the first occurrence of each.
+
+    Each string's hash is computed once and cached by the string, so even
+    long frame contents are only hashed once.
+
+    Args:
+        elements: List of hashable elements.
+
+    Returns:
+        List of unique elements in their original order.
+    """
     return list(dict.fromkeys(elements))
 
 
@@ -555,9 +775,8 @@ def write_beamer_presentation(
     logger.debug(f"Writing Beamer presentation to file: {output_path}")
     # Create target folder if not existing
     target_folder = os.path.dirname(output_path)
-    if not os.path.exists(target_folder):
-        os.makedirs(target_folder)
-        logger.debug(f"Created target folder: {target_folder}")
+    if target_folder:
+        os.makedirs(target_folder, exist_ok=True)
     with open(output_path, "w") as file:
         try:
             file.write(beamer_presentation)
@@ -566,10 +785,15 @@ def write_beamer_presentation(
             logger.error(f"Error writing LaTeX code to file: {e}")
 
 
-def count_folders(folder_path):
-    count = 0
-    for item in os.listdir(folder_path):
-        item_path = os.path.join(folder_path, item)
-        if os.path.isdir(item_path):
-            count += 1
-    return count
+def count_folders(folder_path: str) -> int:
+    """Counts the folders directly inside a folder.
+
+    Args:
+        folder_path: Path to the folder.
+
+    Returns:
+        Number of folders.
+    """
+    # The entries of os.scandir know their type, so most need no stat call
+    with os.scandir(folder_path) as entries:
+        return sum(1 for entry in entries if entry.is_dir())